@@ -3,10 +3,10 @@ import io
 import sys
 import csv
 import platform
+import multiprocessing
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, font as tkfont
 from ttkthemes import ThemedTk
-from matplotlib.backends.backend_pdf import PdfPages
 import matplotlib.pyplot as plt
 import pandas as pd
 from dataframe_for_GPR_analysis import DataframeForAnalysis 
@@ -28,6 +28,100 @@ else:
     TEXT_FONT = ("DejaVu Sans Mono", 11)
 
 
+# ============================ Lazy chart list ============================ #
+class LazyChartList:
+    """
+    Scrollable list of charts that only renders the charts in or near the view.
+    - Every chart gets a slot of fixed height up front, so the scroll region is right before anything
+      is drawn; slot i starts at i slot heights.
+    - After every scroll (mouse wheel or scrollbar, through the canvas' yscrollcommand) and resize,
+      the slots within `margin` views of the visible area get their chart, `draw(frame, item)`, and
+      the charts more than `release_margin` views away lose their Tk canvas, `release(item)`.
+    """
+
+    def __init__(self, plot_canvas, container, scrollbar, draw, release=None, size=None, pady=5,
+                 margin=1.0, release_margin=3.0):
+        self.plot_canvas = plot_canvas
+        self.container = container
+        self.scrollbar = scrollbar
+        self.draw = draw
+        self.release = release
+        dpi = plt.rcParams["figure.dpi"]
+        self.width, self.height = size or (int(8 * dpi), int(4 * dpi))  # the 8x4 in SPC and histogram figures
+        self.pady = pady
+        self.margin = margin
+        self.release_margin = release_margin
+        self.slots = {}  # key -> (frame, item), in display order
+        self.rendered = set()
+        self._pending = None
+
+        plot_canvas.configure(yscrollcommand=self._on_scroll)
+        plot_canvas.bind("<Configure>", lambda e: self.schedule_refresh(), add="+")
+
+    def __contains__(self, key):
+        return key in self.slots
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.schedule_refresh()
+
+    def schedule_refresh(self):
+        """Refresh once, after the pending scroll events."""
+        if self._pending is None:
+            self._pending = self.plot_canvas.after_idle(self.refresh)
+
+    def add(self, key, item):
+        frame = tk.Frame(self.container, bg="white", width=self.width, height=self.height,
+                         highlightthickness=0, bd=0)
+        frame.pack_propagate(False)
+        frame.pack(fill="x", padx=10, pady=self.pady)
+        self.slots[key] = (frame, item)
+
+    def replace(self, key, item):
+        """Give the slot of `key` a new item, drawn at once if the slot is rendered."""
+        frame, _ = self.slots[key]
+        self.slots[key] = (frame, item)
+        if key in self.rendered:
+            self.draw(frame, item)
+
+    def clear(self):
+        for key in list(self.rendered):
+            self._unrender(key)
+        for frame, _ in self.slots.values():
+            if frame.winfo_exists():
+                frame.destroy()
+        self.slots.clear()
+
+    def _unrender(self, key):
+        frame, item = self.slots[key]
+        self.rendered.discard(key)
+        if frame.winfo_exists():
+            for w in frame.winfo_children():
+                w.destroy()
+        if self.release is not None:
+            self.release(item)
+
+    def refresh(self):
+        self._pending = None
+        if not self.plot_canvas.winfo_exists():
+            return
+        for key in [key for key, (frame, _) in self.slots.items() if not frame.winfo_exists()]:
+            if key in self.rendered:  # the plot area was cleared from outside
+                self._unrender(key)
+            del self.slots[key]
+
+        view = max(self.plot_canvas.winfo_height(), self.height)
+        top = self.plot_canvas.canvasy(0)
+        step = self.height + 2 * self.pady
+        for i, (key, (frame, item)) in enumerate(list(self.slots.items())):
+            distance = max(top - (i + 1) * step, i * step - (top + view), 0) / view  # in views
+            if distance <= self.margin and key not in self.rendered:
+                self.draw(frame, item)
+                self.rendered.add(key)
+            elif distance > self.release_margin and key in self.rendered:
+                self._unrender(key)
+
+
 # ============================ OOP App ============================ #
 class SPCApp:
     """
@@ -87,6 +181,50 @@ class SPCApp:
         self.tab_control.bind("<<NotebookTabChanged>>", self._on_tab_changed)
 
     # ---------- Commands used by tabs ---------- #
+    def refresh_file(self):
+        """Load the QA records appended to the current file since it was loaded."""
+        if getattr(self, "df_soc", None) is None:
+            messagebox.showinfo("Refresh", "Load a file first.")
+            return
+
+        try:
+            previous_rows = len(self.df_soc)
+            refreshed = self.df_soc.refresh()
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to refresh file:\n{e}")
+            return
+
+        if refreshed is self.df_soc:
+            messagebox.showinfo("Refresh", "No new records in the file.")
+            return
+
+        # The charts, summaries and outlier windows on display belong to the previous frame
+        try:
+            self.spc_tab.clear_results()
+            self.analysis_tab.chart_list.clear()
+            for w in self.analysis_tab.canvas_container.winfo_children():
+                w.destroy()
+        except Exception as e:
+            print("[DEBUG] Failed to clear the previous results after refresh:", e)
+
+        self.df_soc = refreshed
+        try:
+            self.import_tab.show_summary()
+            self.import_tab.show_info()
+            self.import_tab.show_head()
+            self.import_tab.show_tail()
+            self.analysis_tab.show_statistics()
+            self.spc_tab.update_checkboxes(os.path.basename(self.file_path))
+        except Exception as e:
+            print("[DEBUG] Failed to update views after refresh:", e)
+
+        added = len(refreshed) - previous_rows
+        if added >= 0:
+            messagebox.showinfo("Refresh", f"{added} new record(s) loaded.")
+        else:  # refresh() reloads the whole file when it was not simply appended to
+            messagebox.showinfo("Refresh", f"The file was reloaded: {len(refreshed)} record(s), "
+                                           f"{-added} fewer than before.")
+
     def load_file(self):
         """File dialog + DataFrame_soc load. Updates ImportTab UI."""
         path = filedialog.askopenfilename(
@@ -196,6 +334,8 @@ class SPCApp:
 
     def clear_previous_data(self):
         """Clear old text, plots, and checkboxes before loading a new file."""
+        if self.df_soc is not None:
+            self.df_soc.close_figures()  # the pooled charts of the previous file
         # --- Import Tab ---
         try:
             self.import_tab.file_label.config(text="", fg="green")
@@ -346,6 +486,7 @@ class ImportTab:
         self.warning_label.pack(pady=(0, 5))
 
         ttk.Button(self.frame, text="📁 Load File", command=self.app.load_file).pack(padx=10, pady=10)
+        ttk.Button(self.frame, text="🔄 Refresh", command=self.app.refresh_file).pack(padx=10, pady=(0, 10))
 
         self.file_label = ttk.Label(self.frame, text="", foreground="green",
                                    font=(FONT_FAMILY, max(FONT_SIZE, 8), "bold"))
@@ -620,6 +761,9 @@ class AnalysisTab:
 
         # 🆕 Enable scroll anywhere over histograms
         self._bind_mousewheel(self.plot_canvas, self.canvas_container)
+        # Histograms are drawn as they scroll into view
+        self.chart_list = LazyChartList(self.plot_canvas, self.canvas_container, self.scrollbar,
+                                        draw=self._draw_histogram, release=self._release_histogram, pady=0)
 
     def _build_anderson_tab(self):
         frame = ttk.Frame(self.anderson_tab)
@@ -632,6 +776,8 @@ class AnalysisTab:
 
         ttk.Button(frame, text="Run Anderson–Darling Test",
                 command=self.run_anderson_test).pack(pady=5)
+        ttk.Button(frame, text="Run per Site of Cancer",
+                command=lambda: self.run_anderson_test(by_site=True)).pack(pady=(0, 5))
 
 
         # Treeview
@@ -641,13 +787,17 @@ class AnalysisTab:
 
         self.tree = ttk.Treeview(
             self.anderson_tab,
-            columns=("GPR", "Statistic", "Critical", "Normality"),
+            columns=("GPR", "Statistic", "Critical", "Normality", "A2 p", "W", "W p", "K2 p"),
             show="headings"
         )
         self.tree.heading("GPR", text="GPR")
         self.tree.heading("Statistic", text="A² Statistic")
         self.tree.heading("Critical", text="Critical Value (5%)")
         self.tree.heading("Normality", text="Normality")
+        self.tree.heading("A2 p", text="A² p-value")
+        self.tree.heading("W", text="Shapiro-Francia W'")
+        self.tree.heading("W p", text="W' p-value")
+        self.tree.heading("K2 p", text="K² p-value")
         self.tree.pack(expand=True, fill="both", padx=10, pady=10)
 
         ttk.Button(self.anderson_tab, text="💾 Save as CSV",
@@ -837,8 +987,7 @@ class AnalysisTab:
         out.config(state='disabled')
 
     def show_histograms(self):
-        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-
+        self.chart_list.clear()
         for w in self.canvas_container.winfo_children():
             w.destroy()
 
@@ -853,19 +1002,31 @@ class AnalysisTab:
 
         try:
             system_os = platform.system()
-            figs = df.plot_histograms_gui(selected_columns=selected, return_fig=True)
-            for fig in figs:
-                canvas = FigureCanvasTkAgg(fig, master=self.canvas_container)
-                canvas.draw()
-                canvas.get_tk_widget().pack(expand=True, fill="both")
+            # Skewness and kurtosis of all of them at once; each histogram is drawn when it comes into view
+            shape = df.normality_table(None, selected, df.sorted_criteria(selected))
+            for feature in selected:
+                self.chart_list.add(feature, (feature, shape.loc[feature]))
 
             self.plot_canvas.yview_moveto(0)
+            self.chart_list.refresh()
 
             ttk.Button(self.canvas_container, text="💾 Save All to PDF",
                        command=lambda: self.save_histograms_to_pdf(selected)).pack(pady=10)
         except Exception as e:
             messagebox.showerror("Error", f"Could not display histograms:\n{e}")
 
+    def _draw_histogram(self, frame, item):
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+        feature, shape = item
+        canvas = FigureCanvasTkAgg(self.app.df_soc.histogram_figure(feature, shape), master=frame)
+        canvas.draw()
+        canvas.get_tk_widget().pack(expand=True, fill="both")
+
+    def _release_histogram(self, item):
+        if self.app.df_soc is not None:
+            self.app.df_soc.close_figures([("histogram", item[0])])
+
     def save_histograms_to_pdf(self, selected):
         df = self.app.df_soc
         if df is None:
@@ -875,13 +1036,13 @@ class AnalysisTab:
         if not file_path:
             return
         try:
-            with PdfPages(file_path) as pdf:
-                df.plot_histograms_gui(selected_columns=selected, pdf=pdf)
+            df.export_pdf(file_path, list(df.histogram_report_pages(selected)))  # pages rendered in parallel
             messagebox.showinfo("Success", f"Saved to {file_path}")
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
-    def run_anderson_test(self):
+    def run_anderson_test(self, by_site=False):
+        """Normality tests of the selected metrics; with `by_site` one row per site of cancer and metric."""
         df = self.app.df_soc
         if df is None:
             return
@@ -890,14 +1051,27 @@ class AnalysisTab:
         if not selected:
             messagebox.showwarning("No Selection", "Select at least one QA metric.")
             return
+        if by_site and "Site of cancer" not in df.columns:
+            messagebox.showwarning("No Sites", "The file has no 'Site of cancer' column.")
+            return
         try:
             for i in self.tree.get_children():
                 self.tree.delete(i)
-            results = df.run_anderson_test(selected)
+            if by_site:
+                table = df.normality_tests_by_site(selected)
+                results = [{
+                    "GPR": f"{row['Site of cancer']} | {row['GPR Column']}",
+                    "Statistic": row["A² Statistic"],
+                    **{key: row[key] for key in ("Critical Value (5%)", "Normality", "A² p-value",
+                                                 "Shapiro-Francia W'", "W' p-value", "K² p-value")},
+                } for _, row in table.iterrows()]
+            else:
+                results = df.run_anderson_test(selected)
             for row in results:
                 self.tree.insert("", "end", values=(
                     row["GPR"], f"{row['Statistic']:.3f}",
-                    f"{row['Critical Value (5%)']:.3f}", row["Normality"]
+                    f"{row['Critical Value (5%)']:.3f}", row["Normality"],
+                    *[f"{row[key]:.4f}" for key in ("A² p-value", "Shapiro-Francia W'", "W' p-value", "K² p-value")]
                 ))
         except Exception as e:
             messagebox.showerror("Error", str(e))
@@ -910,7 +1084,8 @@ class AnalysisTab:
         try:
             with open(path, "w", newline="", encoding="utf-8") as f:
                 writer = csv.writer(f)
-                writer.writerow(["GPR", "A² Statistic", "Critical Value (5%)", "Normality"])
+                writer.writerow(["GPR", "A² Statistic", "Critical Value (5%)", "Normality",
+                                 "A² p-value", "Shapiro-Francia W'", "W' p-value", "K² p-value"])
                 for child in self.tree.get_children():
                     writer.writerow(self.tree.item(child)["values"])
             messagebox.showinfo("Saved", f"Results saved to {path}")
@@ -959,8 +1134,11 @@ class AnalysisTab:
 class SPCTab:
     """
     Handles Tab 3: Statistical Process Control (SPC) Analysis.
-    Includes Shewhart, WSD, SC, and SWV methods.
+    Includes Shewhart, WSD, SC, and SWV I-chart methods, EWMA and CUSUM charts and the
+    multivariate Hotelling T² chart.
     """
+    default_n_boot = 1000  # bootstrap replicates offered in the GUI (the API default is 10,000)
+
     def __init__(self, parent_notebook: ttk.Notebook, app):
         self.app = app
         self.frame = ttk.Frame(parent_notebook)
@@ -970,7 +1148,10 @@ class SPCTab:
             "shewhart": 1,
             "wsd": 1,
             "sc": 1,
-            "swv": 1
+            "swv": 1,
+            "ewma": 1,
+            "cusum": 1,
+            "hotelling": 1
         }
 
         # Create sub-tabs for each SPC method
@@ -978,16 +1159,25 @@ class SPCTab:
         self.sub_tabs.pack(expand=1, fill="both", padx=10, pady=10)
 
         # Keep references for each method tab
-        self.methods = ["shewhart", "wsd", "sc", "swv"]
+        self.methods = ["shewhart", "wsd", "sc", "swv", "ewma", "cusum", "hotelling"]
         self.method_names = {
             "shewhart": "Shewhart",
             "wsd": "Weighted Standard Deviation",
             "sc": "Skewness Correction",
-            "swv": "Scaled Weighted Variance"
+            "swv": "Scaled Weighted Variance",
+            "ewma": "Exponentially Weighted Moving Average",
+            "cusum": "Cumulative Sum (CUSUM)",
+            "hotelling": "Hotelling T² (Multivariate)"
         }
         self.method_tabs = {}
         self.checkbox_frames = {}
         self.plot_containers = {}
+        self.spc_results = {}   # method -> SPCResult list of the charts on display
+        self.window_vars = {}   # method -> rolling window length (0 = whole history)
+        self.confidence_vars = {}  # method -> confidence level of the run
+        self.bootstrap_vars = {}   # method -> add bootstrap intervals of the limits to the summary
+        self.n_boot_vars = {}      # method -> number of bootstrap replicates
+        self.chart_lists = {}   # method -> LazyChartList of the charts on display, keyed by column
 
         for method in self.methods:
             self._build_spc_tab(method)
@@ -996,11 +1186,6 @@ class SPCTab:
         self.active_method = tk.StringVar(value="shewhart")
         self.sub_tabs.bind("<<NotebookTabChanged>>", self._on_tab_changed)
 
-        # ONE unified elimination log
-        self.elimination_log = []
-
-        # Shared counter for the whole SPC session
-        self.elimination_round = 1
 
     def _build_spc_tab(self, method: str):
         """Create a single SPC method tab with checkbox grid and plot area."""
@@ -1019,11 +1204,61 @@ class SPCTab:
         checkbox_frame = self._create_checkbox_grid(tab)
         self.checkbox_frames[method] = checkbox_frame
 
+        # Rolling limits, bootstrap, per-site runs, sweeps and auto elimination are I-chart tools
+        is_i_chart = method in DataframeForAnalysis.spc_methods
+
+        # Rolling limits: 0 keeps one set of limits over the whole history
+        window_frame = ttk.Frame(tab)
+        window_frame.pack(pady=(4, 0))
+        if is_i_chart:
+            ttk.Label(window_frame, text="Rolling window (last N plans, 0 = whole history):").pack(side="left")
+            window_var = tk.IntVar(value=0)
+            ttk.Spinbox(window_frame, from_=0, to=100000, increment=10, width=8,
+                        textvariable=window_var).pack(side="left", padx=5)
+            self.window_vars[method] = window_var
+
+        # Any level can be typed in; the list holds the tabulated ones
+        ttk.Label(window_frame, text="Confidence level:").pack(side="left", padx=(15, 0))
+        confidence_var = tk.StringVar(value="99.73%")
+        ttk.Combobox(window_frame, textvariable=confidence_var, width=8,
+                     values=list(DataframeForAnalysis.z_table.keys())).pack(side="left", padx=5)
+        self.confidence_vars[method] = confidence_var
+
+        if is_i_chart:
+            bootstrap_var = tk.BooleanVar(value=False)
+            ttk.Checkbutton(window_frame, text="Bootstrap 95% CIs of the limits",
+                            variable=bootstrap_var).pack(side="left", padx=(15, 0))
+            self.bootstrap_vars[method] = bootstrap_var
+            # The bootstrap runs on the GUI thread: about 1 s per 1,000 replicates of 2,000 plans x 15 metrics
+            ttk.Label(window_frame, text="replicates:").pack(side="left", padx=(5, 0))
+            n_boot_var = tk.IntVar(value=self.default_n_boot)
+            ttk.Spinbox(window_frame, from_=200, to=20000, increment=200, width=7,
+                        textvariable=n_boot_var).pack(side="left", padx=5)
+            self.n_boot_vars[method] = n_boot_var
+
+        run_frame = ttk.Frame(tab)
+        run_frame.pack(pady=(4, 6))
         ttk.Button(
-            tab,
+            run_frame,
             text=f"▶ Run {method.upper()} SPC",
             command=lambda m=method: self.run_spc_analysis(m)
-        ).pack(pady=(4, 6))
+        ).pack(side="left", padx=5)
+        if is_i_chart:
+            ttk.Button(
+                run_frame,
+                text="▶ Run per Site of Cancer",
+                command=lambda m=method: self.run_site_analysis(m)
+            ).pack(side="left", padx=5)
+            ttk.Button(
+                run_frame,
+                text="📈 Confidence Sweep",
+                command=lambda m=method: self.run_confidence_sweep(m)
+            ).pack(side="left", padx=5)
+            ttk.Button(
+                run_frame,
+                text="📄 Department Report",
+                command=lambda m=method: self.save_department_report(m)
+            ).pack(side="left", padx=5)
         
         # === Scrollable plot area === #
         plot_area = ttk.Frame(tab)
@@ -1042,14 +1277,32 @@ class SPCTab:
         self.plot_containers[method] = container
 
         self._bind_mousewheel(plot_canvas, container)
+        self.chart_lists[method] = LazyChartList(plot_canvas, container, scrollbar,
+                                                 draw=self._draw_chart, release=self._release_chart)
 
         exit_frame = ttk.Frame(tab)
         exit_frame.pack(pady=10)
+        if is_i_chart:
+            ttk.Button(
+                exit_frame,
+                text="⚡ Auto Eliminate",
+                command=lambda m=method: self.auto_eliminate(m)
+            ).pack(side="left", padx=5)
+        ttk.Button(
+            exit_frame,
+            text="↶ Undo Elimination",
+            command=lambda m=method: self.undo_elimination(m)
+        ).pack(side="left", padx=5)
+        ttk.Button(
+            exit_frame,
+            text="↷ Redo Elimination",
+            command=lambda m=method: self.redo_elimination(m)
+        ).pack(side="left", padx=5)
         ttk.Button(
             exit_frame,
             text="❌ Exit SPC Session",
             command=self.exit_spc_session
-        ).pack()
+        ).pack(side="left", padx=5)
 
     def _bind_mousewheel(self, canvas: tk.Canvas, area: tk.Widget):
         """Enable scrolling with the mouse wheel anywhere over the plot area.
@@ -1160,7 +1413,22 @@ class SPCTab:
                 self.method_tabs[key].config(text="❌ Failed to load file", foreground="red")
 
 
-    def run_spc_analysis(self, method):
+    def clear_results(self):
+        """Drop the charts, results and popups of every method (the data moved to another frame)."""
+        for w in list(self.open_windows):
+            try:
+                if w.winfo_exists():
+                    w.destroy()
+            except Exception:
+                pass
+        self.open_windows.clear()
+        for method in self.methods:
+            self.chart_lists[method].clear()
+            for w in self.plot_containers[method].winfo_children():
+                w.destroy()
+        self.spc_results.clear()
+
+    def _close_outlier_windows(self):
         for win in list(self.open_windows):
             try:
                 if win.winfo_exists() and "Select Outliers" in win.title():
@@ -1168,6 +1436,18 @@ class SPCTab:
                     self.open_windows.remove(win)
             except:
                 pass
+
+    def _check_confidence_level(self, method):
+        """Validate the typed confidence level of `method` before the charts on display are cleared."""
+        try:
+            self.app.df_soc.get_z_info(self.confidence_vars[method].get())
+        except ValueError as e:
+            messagebox.showerror("Invalid Confidence Level", str(e))
+            return False
+        return True
+
+    def run_spc_analysis(self, method):
+        self._close_outlier_windows()
         df = self.app.df_soc
         if df is None:
             messagebox.showwarning("No data", "Please load a dataset first.")
@@ -1177,72 +1457,267 @@ class SPCTab:
         if not selected:
             messagebox.showwarning("No Selection", f"Please select at least one QA metric for {method.upper()}.")
             return
+        if not self._check_confidence_level(method):
+            return
 
         # Clear previous plots
         container = self.plot_containers[method]
+        chart_list = self.chart_lists[method]
+        chart_list.clear()
         for w in container.winfo_children():
             w.destroy()
 
-        # Call the right DataFrame_soc method
-        method_func = {
-            "shewhart": df.get_shewhart_x_chart_figs,
-            "wsd": df.get_wsd_x_chart_figs,
-            "sc": df.get_sc_x_chart_figs,
-            "swv": df.get_swv_x_chart_figs
-        }.get(method)
-
-        if not method_func:
+        if method not in df.chart_methods:
             messagebox.showerror("Error", f"Unknown SPC method: {method}")
             return
 
+        for result in self.spc_results.pop(method, []):
+            df.release_result(result)  # charts still in the result cache stay open for a repeat view
+
+        results = []
         try:
-            figs, outlier_dict, results_list = method_func(selected_columns=selected)
-            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-
-            for fig in figs:
-                fig.patch.set_facecolor("white")
-                fig.patch.set_alpha(1.0)
-
-                frame = tk.Frame(container, bg="white", highlightthickness=0, bd=0)
-                frame.pack(expand=True, fill="both", padx=10, pady=5)
-                canvas = FigureCanvasTkAgg(fig, master=frame)
-                canvas.draw()
-                canvas.get_tk_widget().pack(expand=True, fill="both")
+            # Limits and outliers only; each figure is built when it is drawn below
+            results = self._compute_results(method, selected)
+            self.spc_results[method] = results
+
+            for result in results:
+                chart_list.add(result.column, result)
             
             plot_canvas = container.master
             if isinstance(plot_canvas, tk.Canvas):
                 plot_canvas.yview_moveto(0)
+            chart_list.refresh()  # only the charts in or near the view are drawn now
         
-            stats_window = self.show_spc_stats(results_list, method)
-
-            # open outlier selection
-            if outlier_dict and any(outlier_dict[k] for k in outlier_dict):
-                self.open_outliers_window(outlier_dict, method)
-            else:
-                messagebox.showinfo("No Outliers", f"No outliers detected in {method.upper()} SPC for the selected QA metrics.")
-                # Restore summary window visibility exactly after messagebox closes
-                stats_window.after_idle(lambda: (stats_window.lift(), stats_window.focus_force()))
+            self._show_spc_outcome(results, method)
 
         except Exception as e:
             messagebox.showerror("Error", f"Failed to run {method.upper()} SPC:\n{e}")
         
         ttk.Button(container, text="💾 Save All Plots to PDF",
-           command=lambda: self.save_spc_plots_to_pdf(figs, method)).pack(pady=8)
+           command=lambda: self.save_spc_plots_to_pdf(results, method)).pack(pady=8)
+
+    def update_spc_analysis(self, method, columns):
+        """
+        Recalculate only the charts of `columns` (e.g. after an elimination) and keep the others.
+        Falls back to a full run when those charts are not on display.
+        """
+        results = self.spc_results.get(method)
+        chart_list = self.chart_lists[method]
+        changed = [result.column for result in results or [] if result.column in columns]
+        if (not results or any(column not in chart_list for column in changed)
+                or method in DataframeForAnalysis.multivariate_methods):  # one chart over every criterion
+            self.run_spc_analysis(method)
+            return
+
+        self._close_outlier_windows()
+        try:
+            updated = {result.column: result for result in self._compute_results(method, changed)}
+            for i, result in enumerate(results):
+                if result.column not in updated:
+                    continue
+                self.app.df_soc.release_result(result)
+                results[i] = updated[result.column]  # in place, so the PDF button sees the new charts
+                chart_list.replace(result.column, results[i])  # redrawn now only if it is rendered
+
+            self._show_spc_outcome(results, method)
+
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to run {method.upper()} SPC:\n{e}")
+
+    def _compute_results(self, method, columns):
+        """SPC results of `columns`, with rolling limits when a window length is set."""
+        df = self.app.df_soc
+        window = self.window_vars[method].get() if method in self.window_vars else 0
+        confidence_level = self.confidence_vars[method].get()
+        if window > 0:
+            return [df.compute_rolling_spc(column, method, confidence_level, window=window) for column in columns]
+        n_boot = 0
+        if method in self.bootstrap_vars and self.bootstrap_vars[method].get():
+            n_boot = max(int(self.n_boot_vars[method].get()), 1)
+        return df.compute_spc(method, confidence_level, selected_columns=columns, n_boot=n_boot)
+
+    def _draw_chart(self, frame, result):
+        """Show the chart of `result` in `frame`; a pooled figure already shown there is only redrawn."""
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+        fig = result.figure
+        fig.patch.set_facecolor("white")
+        fig.patch.set_alpha(1.0)
+
+        canvas = fig.canvas
+        if isinstance(canvas, FigureCanvasTkAgg) and canvas.get_tk_widget().master is frame:
+            canvas.draw_idle()
+            return
+        for w in frame.winfo_children():
+            w.destroy()
+        canvas = FigureCanvasTkAgg(fig, master=frame)
+        canvas.draw()
+        canvas.get_tk_widget().pack(expand=True, fill="both")
+
+    def _release_chart(self, result):
+        """A chart scrolled far out of view closes its pooled figure; it is drawn again when it comes back."""
+        df = self.app.df_soc
+        if df is not None and df.owned_figure(result.figure_key, result) is not None:
+            df.close_figures([result.figure_key])
+
+    def _show_spc_outcome(self, results, method):
+        """Summary window, then the outlier selection (or a 'no outliers' note)."""
+        outlier_dict = {result.column: result.out_of_control_ids for result in results}
+        results_list = [result.summary_row() for result in results]
+
+        stats_window = self.show_spc_stats(results_list, method)
+
+        # open outlier selection
+        if outlier_dict and any(outlier_dict[k] for k in outlier_dict):
+            self.open_outliers_window(outlier_dict, method)
+        else:
+            messagebox.showinfo("No Outliers", f"No outliers detected in {method.upper()} SPC for the selected QA metrics.")
+            # Restore summary window visibility exactly after messagebox closes
+            stats_window.after_idle(lambda: (stats_window.lift(), stats_window.focus_force()))
         
-    def save_spc_plots_to_pdf(self, figs, method):
+    def run_site_analysis(self, method):
+        """Stratified run: the selected metrics are analysed separately for every site of cancer."""
+        df = self.app.df_soc
+        if df is None:
+            messagebox.showwarning("No data", "Please load a dataset first.")
+            return
+        if "Site of cancer" not in df.columns:
+            messagebox.showwarning("No Sites", "The file has no 'Site of cancer' column.")
+            return
+
+        selected = [col for col, var in self.checkbox_frames[method].vars_dict.items() if var.get()]
+        if not selected:
+            messagebox.showwarning("No Selection", f"Please select at least one QA metric for {method.upper()}.")
+            return
+
+        try:
+            table = df.compute_spc_by_site([method], self.confidence_vars[method].get(), selected_columns=selected)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to run {method.upper()} SPC per site:\n{e}")
+            return
+        self.show_site_stats(table, method)
+
+    def show_site_stats(self, table, method):
+        """Display the per-site SPC summary in a popup window."""
+        stats_window = tk.Toplevel(self.frame)
+        self.open_windows.append(stats_window)
+        stats_window.title(f"{method.upper()} SPC Summary per Site of Cancer")
+        stats_window.geometry("+60+90")
+
+        columns = ["Site", "GPR", "Mean", "Count", "LCL", "UCL", "LSL", "USL", "Outliers"]
+        tree = ttk.Treeview(stats_window, columns=columns, show="headings")
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, anchor="center", width=90)
+        tree.column("Site", width=140)
+        tree.column("GPR", width=180)
+
+        for row in table.to_dict("records"):
+            tree.insert("", "end", values=(
+                row["Site of cancer"],
+                row["GPR Column"],
+                row["Mean (X̄)"],
+                row["Counts"],
+                row["LCL"],
+                row["UCL"],
+                row["LSL"] if pd.notna(row["LSL"]) else "-",
+                row["USL"] if pd.notna(row["USL"]) else "-",
+                "Yes" if row["Out-of-Control IDs"] else "No"
+            ))
+
+        tree.pack(expand=True, fill="both", padx=10, pady=10)
+
+        ttk.Button(stats_window, text="💾 Save as CSV",
+                command=lambda: self.save_summary_to_csv(tree, method)).pack(pady=6)
+        return stats_window
+
+    def run_confidence_sweep(self, method):
+        """Out-of-control counts of the selected metrics for 200 confidence levels from 90% to 99.9%."""
+        df = self.app.df_soc
+        if df is None:
+            messagebox.showwarning("No data", "Please load a dataset first.")
+            return
+
+        selected = [col for col, var in self.checkbox_frames[method].vars_dict.items() if var.get()]
+        if not selected:
+            messagebox.showwarning("No Selection", f"Please select at least one QA metric for {method.upper()}.")
+            return
+
+        levels = [0.90 + i * (0.999 - 0.90) / 199 for i in range(200)]
+        try:
+            table = df.confidence_sweep(levels, methods=[method], selected_columns=selected)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to run the {method.upper()} confidence sweep:\n{e}")
+            return
+
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+        win = tk.Toplevel(self.frame)
+        self.open_windows.append(win)
+        win.title(f"{method.upper()} SPC Confidence Sweep")
+
+        fig, ax = plt.subplots(figsize=(8, 4))
+        for column, group in table.groupby("GPR Column", sort=False):
+            ax.plot(group["Confidence Level"] * 100, group["Out-of-Control Count"], label=column)
+        ax.set_xlabel("Confidence Level (%)")
+        ax.set_ylabel("Out-of-Control Points")
+        ax.set_title(f"{self.method_names[method]}: Outliers vs Confidence Level")
+        ax.legend(loc="upper right", fontsize=7)
+        fig.tight_layout()
+
+        canvas = FigureCanvasTkAgg(fig, master=win)
+        canvas.draw()
+        canvas.get_tk_widget().pack(expand=True, fill="both")
+        win.protocol("WM_DELETE_WINDOW", lambda: (plt.close(fig), win.destroy()))
+
+        def save_csv():
+            path = filedialog.asksaveasfilename(defaultextension=".csv",
+                                                filetypes=[("CSV files", "*.csv")],
+                                                title=f"Save {method.upper()} Confidence Sweep")
+            if path:
+                table.to_csv(path, index=False, encoding="utf-8-sig")
+                messagebox.showinfo("Saved", f"Confidence sweep saved to {path}")
+
+        ttk.Button(win, text="💾 Save as CSV", command=save_csv).pack(pady=6)
+
+    def save_spc_plots_to_pdf(self, results, method):
         path = filedialog.asksaveasfilename(defaultextension=".pdf",
                                             filetypes=[("PDF files", "*.pdf")],
                                             title=f"Save {method.upper()} SPC Plots")
         if not path:
             return
         try:
-            with PdfPages(path) as pdf:
-                for fig in figs:
-                    pdf.savefig(fig, bbox_inches="tight")
+            # Rendered again from the limits in worker processes, not from the figures on screen
+            self.app.df_soc.export_pdf(path, list(self.app.df_soc.spc_report_pages(results)))
             messagebox.showinfo("Saved", f"All {method.upper()} SPC plots saved to:\n{path}")
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
+    def save_department_report(self, method):
+        """
+        PDF of every site of cancer x I-chart method x selected metric, followed by their histograms.
+        Pages are generated site by site and rendered in worker processes.
+        """
+        df = self.app.df_soc
+        if df is None:
+            messagebox.showwarning("No data", "Please load a dataset first.")
+            return
+        selected = [col for col, var in self.checkbox_frames[method].vars_dict.items() if var.get()]
+        if not selected:
+            messagebox.showwarning("No Selection", "Please select at least one QA metric for the report.")
+            return
+        path = filedialog.asksaveasfilename(defaultextension=".pdf",
+                                            filetypes=[("PDF files", "*.pdf")],
+                                            title="Save Department Report")
+        if not path:
+            return
+        try:
+            df.export_pdf(path, df.department_report_pages(confidence_level=self.confidence_vars[method].get(),
+                                                           selected_columns=selected))
+            messagebox.showinfo("Saved", f"Department report saved to:\n{path}")
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+
     def _on_tab_changed(self, event):
         selected_tab = event.widget.select()
         tab_text = event.widget.tab(selected_tab, "text").strip().lower()
@@ -1250,7 +1725,10 @@ class SPCTab:
             "shewhart": "shewhart",
             "weighted standard deviation": "wsd",
             "skewness correction": "sc",
-            "scaled weighted variance": "swv"
+            "scaled weighted variance": "swv",
+            "exponentially weighted moving average": "ewma",
+            "cumulative sum (cusum)": "cusum",
+            "hotelling t² (multivariate)": "hotelling"
         }
         self.active_method.set(mapping.get(tab_text, "shewhart"))
 
@@ -1272,12 +1750,21 @@ class SPCTab:
         style.configure("Treeview", font=(FONT_FAMILY, FONT_SIZE))
         style.configure("Treeview.Heading", font=(FONT_FAMILY, FONT_SIZE, "bold"))
 
-        columns = ["GPR", "Mean", "Count", "LCL", "UCL", "LSL", "USL", "Outliers"]
+        columns = ["GPR", "Mean", "Count", "LCL", "UCL", "LSL", "USL", "Outliers", "Run Rules"]
+        interval_keys = [key for key in ("LCL CI", "UCL CI", "LSL CI", "USL CI")
+                         if results_list and key in results_list[0]]
+        columns += interval_keys
+        has_contributors = bool(results_list) and "Top Contributors" in results_list[0]
+        if has_contributors:
+            columns.append("Top Contributors")
         tree = ttk.Treeview(stats_window, columns=columns, show="headings")
         for col in columns:
             tree.heading(col, text=col)
             tree.column(col, anchor="center", width=100)
         tree.column("GPR", width=180)
+        tree.column("Run Rules", width=260)
+        if has_contributors:
+            tree.column("Top Contributors", width=420, anchor="w")
 
         for row in results_list:
             tree.insert("", "end", values=(
@@ -1288,7 +1775,11 @@ class SPCTab:
                 row["UCL"],
                 row["LSL"] if row["LSL"] else "-",
                 row["USL"] if row["USL"] else "-",
-                "Yes" if row["Out-of-Control IDs"] else "No"
+                "Yes" if row["Out-of-Control IDs"] else "No",
+                "; ".join(f"{rule} ({len(ids)})" for rule, ids in row.get("Run-Rule Violations", {}).items()) or "-",
+                *["-" if pd.isna(row[key][0]) else f"{row[key][0]} – {row[key][1]}" for key in interval_keys],
+                *(["; ".join(f"{_id}: {', '.join(crits)}" for _id, crits in row["Top Contributors"].items()) or "-"]
+                  if has_contributors else [])
             ))
 
         tree.pack(expand=True, fill="both", padx=10, pady=10)
@@ -1351,26 +1842,18 @@ class SPCTab:
             if not metric or not selected:
                 messagebox.showwarning("Missing Selection", "Select a metric and at least one ID.")
                 return
-            round_num = self.elimination_round
+            # Each call is one elimination round (layer) of the session; the log is kept by the data
             log = self.app.df_soc.elimination_recalculate_gui(
                 method=method,
-                confidence_level="99.73%",
+                confidence_level=self.confidence_vars[method].get(),
                 selected_criterion=metric,
-                selected_ids=selected,
-                round_num=round_num
+                selected_ids=selected
             )
 
-            self.elimination_round += 1
-
-            # Attach method name to each entry + append to unified log
-            for entry in log:
-                entry_list = list(entry)  # entry is [round, criterion, id, value]
-                entry_list.insert(1, method)  # => [round, method, criterion, id, value]
-                self.elimination_log.append(entry_list)
             messagebox.showinfo("Success", "Outliers eliminated and data recalculated.")
             win.destroy()
-            # rerun analysis with updated data
-            self.run_spc_analysis(method)
+            # recalculate the criteria that lost values; the other charts are unchanged
+            self.update_spc_analysis(method, {entry[1] for entry in log})
 
             container = self.plot_containers[method]
             plot_canvas = container.master
@@ -1379,21 +1862,73 @@ class SPCTab:
         
         ttk.Button(win, text="Eliminate Selected IDs", command=eliminate).grid(row=2, column=1, pady=10, sticky="e")
     
+    def auto_eliminate(self, method):
+        """Eliminate the outliers of the selected metrics round after round until none is left."""
+        df = self.app.df_soc
+        if df is None:
+            messagebox.showwarning("No data", "Please load a dataset first.")
+            return
+
+        selected = [col for col, var in self.checkbox_frames[method].vars_dict.items() if var.get()]
+        if not selected:
+            messagebox.showwarning("No Selection", f"Please select at least one QA metric for {method.upper()}.")
+            return
+
+        try:
+            log = df.auto_eliminate(method, self.confidence_vars[method].get(), selected_columns=selected)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to eliminate the {method.upper()} outliers:\n{e}")
+            return
+
+        rounds = len({entry[0] for entry in log})
+        messagebox.showinfo("Auto Elimination",
+                            f"{len(log)} values eliminated in {rounds} round(s).\n"
+                            "Each round can be undone with 'Undo Elimination'.")
+        self.run_spc_analysis(method)
+
+    def undo_elimination(self, method):
+        """Undo the last elimination round and update the charts it changed."""
+        df = self.app.df_soc
+        if df is None:
+            return
+        changed = df.undo_elimination()
+        if not changed:
+            messagebox.showinfo("Undo", "No elimination to undo.")
+            return
+        if self.spc_results.get(method):
+            self.update_spc_analysis(method, set(changed))
+
+    def redo_elimination(self, method):
+        """Apply the last undone elimination round again and update the charts it changed."""
+        df = self.app.df_soc
+        if df is None:
+            return
+        changed = df.redo_elimination()
+        if not changed:
+            messagebox.showinfo("Redo", "No elimination to redo.")
+            return
+        if self.spc_results.get(method):
+            self.update_spc_analysis(method, set(changed))
+
     def exit_spc_session(self):
         """Reset SPC analysis state and restore original data."""
         if self.app.file_path is None or self.app.df_soc is None:
             return
 
-        if messagebox.askyesno("Reset SPC", "Do you want to reset and reload the original data?"):
-            self.app.df_soc = DataframeForAnalysis.from_file(self.app.file_path)
+        if messagebox.askyesno("Reset SPC", "Do you want to reset and restore the original data?"):
+            elimination_log = self.app.df_soc.elimination_log()
+            self.app.df_soc.reset_eliminations()  # original values are kept in memory, no reload
+            self.app.df_soc.clear_result_cache()
+            self.app.df_soc.close_figures()
             for method in self.methods:
+                self.chart_lists[method].clear()
                 container = self.plot_containers[method]
                 for w in container.winfo_children():
                     w.destroy()
                 for var in self.checkbox_frames[method].vars_dict.values():
                     var.set(False)
 
-            if self.elimination_log:
+            if elimination_log:
                 save = messagebox.askyesno(
                     "Save Eliminations?",
                     "Do you want to save the elimination log?"
@@ -1401,7 +1936,7 @@ class SPCTab:
 
                 if save:
                     df = pd.DataFrame(
-                        self.elimination_log,
+                        elimination_log,
                         columns=["#Elimination", "Method", "Criterion", "ID", "Eliminated Value"]
                     )
 
@@ -1415,9 +1950,6 @@ class SPCTab:
                         df.to_csv(save_path, index=False, encoding="utf-8-sig")
                         messagebox.showinfo("Saved", f"Elimination log saved to:\n{save_path}")
 
-                self.elimination_log = []
-                self.elimination_round = 1
-
             for w in list(self.open_windows):
                 try:
                     if w.winfo_exists():
@@ -1429,12 +1961,14 @@ class SPCTab:
             self.update_spc_file_labels(os.path.basename(self.app.file_path))
             self.app.spc_tab.update_checkboxes(os.path.basename(self.app.file_path))
             plt.close('all')
+            self.spc_results.clear()
             self.window_counters = {"summary": 0}
             messagebox.showinfo("SPC Reset", "Original dataset reloaded.")
 
 
 # ============================ main ============================ #
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # per-site workers in the frozen executables
     root = ThemedTk(theme="arc")
     app = SPCApp(root)
     root.mainloop()
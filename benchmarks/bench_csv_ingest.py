@@ -0,0 +1,90 @@
+"""
+Benchmark of the CSV ingest paths of DataframeForAnalysis.from_file: the default tolerant parser
+against the typed fast path (fast_csv), with and without chunksize.
+
+Every load runs in its own process, so the reported peak RSS is that of a single load.
+The cache is disabled, so every run parses the file.
+
+    python benchmarks/bench_csv_ingest.py --rows 10000 1000000
+    python benchmarks/bench_csv_ingest.py --rows 10000000 --modes typed chunked
+
+The default parser needs over 20 GB at 10M rows; leave it out of that run on smaller machines.
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from dataframe_for_GPR_analysis import DataframeForAnalysis  # noqa: E402
+
+MODES = {
+    "default": dict(fast_csv=False),
+    "typed": dict(fast_csv=True),
+    "chunked": dict(fast_csv=True, chunksize=100_000),
+}
+
+
+def write_template_csv(path, rows, seed=0, block=1_000_000):
+    """Synthetic file with the template columns: GPRs in [85, 100], mean/max γ and MedianDoseDev."""
+    rng = np.random.default_rng(seed)
+    for start in range(0, rows, block):
+        n = min(block, rows - start)
+        data = {
+            "ID": [f"P{i:08d}" for i in range(start, start + n)],
+            "Site of cancer": rng.choice(["Prostate", "Head and Neck", "Breast", "Lung"], n),
+            "QA Date": (pd.Timestamp("2015-01-01") + pd.to_timedelta(rng.integers(0, 3650, n), unit="D"))
+            .strftime("%Y-%m-%d"),
+        }
+        for column in DataframeForAnalysis.criteria + DataframeForAnalysis.mean_max:
+            data[column] = np.round(100 - rng.gamma(2, 2.5, n).clip(0, 15), 2)
+        data["MedianDoseDev"] = np.round(rng.normal(0, 1, n), 3)
+        pd.DataFrame(data).to_csv(path, mode="w" if start == 0 else "a", header=start == 0, index=False)
+
+
+def load_once(path, mode):
+    """Child process: load the file once and print the wall time and the process's peak RSS (kB)."""
+    start = time.perf_counter()
+    DataframeForAnalysis.from_file(path, use_cache=False, **MODES[mode])
+    print(time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def measure(path, mode):
+    """Wall time (s) and peak RSS (MB) of one load in a fresh process."""
+    output = subprocess.run([sys.executable, __file__, "--load", path, mode],
+                            check=True, capture_output=True, text=True).stdout
+    seconds, peak = output.split()[-2:]
+    return float(seconds), int(peak) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 1_000_000])
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--load", nargs=2, metavar=("PATH", "MODE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.load:
+        load_once(*args.load)
+        return
+
+    with tempfile.TemporaryDirectory() as folder:
+        for rows in args.rows:
+            path = os.path.join(folder, f"template_{rows}.csv")
+            write_template_csv(path, rows)
+            print(f"{rows:,} rows ({os.path.getsize(path) / 2 ** 20:.0f} MB)")
+            for mode in args.modes:
+                seconds, peak = measure(path, mode)
+                print(f"  {mode:<8} {seconds:8.2f} s  {peak:8.0f} MB")
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,19 +3,29 @@ import numpy as np
 import seaborn as sns
 import matplotlib.pyplot as plt
 import matplotlib.ticker as mticker
-from scipy.stats import anderson
-from scipy.stats import norm
-from scipy.stats import skew
+from matplotlib.backends.backend_pdf import PdfPages
+from scipy.special import ndtri, ndtr, log_ndtr
 from scipy.interpolate import interp1d
+from scipy.signal import lfilter
+from scipy.stats import beta
 import os
+import io
+import json
+import shutil
+import hashlib
+import tempfile
+import warnings
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 from decimal import Decimal, ROUND_HALF_UP
-from tkinter import messagebox
 
 class DataframeForAnalysis(pd.DataFrame):
-    _metadata = ["site_of_cancer", "gamma"]  # This tells Pandas to treat it as a real attribute
+    _metadata = ["site_of_cancer", "gamma", "spc_sums", "id_index", "original_values", "exclusion_masks",
+                 "elimination_layers", "redo_layers", "result_cache", "data_versions", "figure_pool",
+                 "sorted_cache"]  # This tells Pandas to treat it as a real attribute
 
     b = 6
-
     GPRs_n_Names = ["ID", "QA Date", "Global 3%3mm", "Global 3%2mm", "Global 3%1mm",
                     "Global 2%2mm", "Global 2%1mm", "Global 1%2mm", "Global 1%1mm",
                     "Local 3%3mm", "Local 3%2mm", "Local 3%1mm", "Local 2%2mm",
@@ -39,29 +49,70 @@ class DataframeForAnalysis(pd.DataFrame):
         "99.73%": {"alpha": 0.0027, "z_score": 3.000},
     }
 
+    z_cache = {}  # confidence level (fraction) -> (alpha, z) for levels outside z_table, see get_z_info
+    confidence_range = (0.5, 0.9999)  # accepted confidence levels (fractions), see get_z_info
+
+    d2 = 1.128
+
+    # Western Electric / Nelson run rules, checked inside the control limits (see run_rule_violations):
+    # name -> (pattern, points in the window, points that must match, zone in σ)
+    run_rules = {
+        "2 of 3 beyond 2σ": ("zone", 3, 2, 2),
+        "4 of 5 beyond 1σ": ("zone", 5, 4, 1),
+        "8 in a row on one side": ("side", 8, 8, None),
+        "6 in a row trending": ("trend", 6, 6, None),
+        "14 in a row alternating": ("alternate", 14, 14, None),
+        "15 in a row within 1σ": ("inner", 15, 15, 1),
+        "8 in a row beyond 1σ": ("outer", 8, 8, 1),
+    }
+
+    result_cache_size = 60  # SPC results (with their figures) kept by compute_spc, see RESULT CACHE
+
+    spc_methods = {"shewhart": "Shewhart", "wsd": "WSD", "sc": "SC", "swv": "SWV"}  # I-chart methods
+    time_weighted_methods = {"ewma": "EWMA", "cusum": "CUSUM"}  # see compute_time_weighted_spc
+    multivariate_methods = {"hotelling": "Hotelling T²"}  # one chart over all criteria, see compute_hotelling_spc
+    chart_methods = {**spc_methods, **time_weighted_methods, **multivariate_methods}
+
+    ewma_lambda = 0.2  # EWMA weight of the newest plan
+    cusum_k = 0.5      # CUSUM reference value (allowed slack), in σ
+    cusum_h = 5.0      # CUSUM decision interval, in σ
+
+    # SWV and WSD weights as a function of P_X
+    PX_values = np.array([0.30, 0.32, 0.34, 0.36, 0.38, 0.40, 0.42, 0.44, 0.46, 0.48,
+                          0.50, 0.52, 0.54, 0.56, 0.58, 0.60, 0.62, 0.64, 0.66, 0.68, 0.70])
+    WL_values = np.array([3.26, 2.98, 2.74, 2.53, 2.36, 2.26, 2.14, 2.04, 1.97, 1.93, 1.88,
+                          1.86, 1.83, 1.81, 1.82, 1.84, 1.85, 1.89, 1.96, 2.04, 2.13])
+    WU_values = np.flip(WL_values)
+    d2_WSD_values = np.array([0.947, 0.982, 1.012, 1.039, 1.063, 1.083, 1.099, 1.112, 1.121,
+                              1.126, 1.128, 1.126, 1.121, 1.112, 1.099, 1.083, 1.063,
+                              1.039, 1.012, 0.982, 0.947])
+
+    # SC d2 as a function of |skewness|
+    k3_values = np.array([0.00, 0.40, 0.80, 1.20, 1.60, 2.00, 2.40, 2.80, 3.20, 3.60, 4.00])
+    d2_sc_values = np.array([1.12, 1.12, 1.11, 1.08, 1.05, 1.02, 0.98, 0.95, 0.92, 0.90, 0.88])
+
+    # "extrapolate": If someone gives me an input outside the range of PX, just extend the line and estimate it.
+    interp_WL = interp1d(PX_values, WL_values, kind='linear', fill_value="extrapolate")
+    interp_WU = interp1d(PX_values, WU_values, kind='linear', fill_value="extrapolate")
+    interp_d2_WSD = interp1d(PX_values, d2_WSD_values, kind='linear', fill_value="extrapolate")
+    interp_d2_sc = interp1d(k3_values, d2_sc_values, kind='linear', fill_value="extrapolate")
+
     def __init__(self, data=None, file_path=None, *args, **kwargs):
         """
         Initialize the DataFrame_soc object. Subclass of pandas.
         """
         self.site_of_cancer = None  # Initialize attribute
+        gamma = kwargs.pop("gamma", None)
+        presorted = kwargs.pop("presorted", False)  # data already sorted by 'QA Date' (e.g. from the cache)
+        fast_csv = kwargs.pop("fast_csv", False)
+        chunksize = kwargs.pop("chunksize", None)
 
         if file_path:
             ext = os.path.splitext(file_path)[1].lower()
             id_converter = {"ID": str}
             if ext == ".csv":
-                import csv
-                # --- auto-detect delimiter for CSV (comma, semicolon, or tab) ---
-                with open(file_path, "r", encoding="utf-8") as f:
-                    sample = f.read(2048)
-                    f.seek(0)
-                    try:
-                        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
-                        delimiter = dialect.delimiter
-                    except Exception:
-                        delimiter = ","  # fallback if detection fails
-
-                data = pd.read_csv(file_path, sep=delimiter, converters=id_converter, engine="python")
-                data.columns = data.columns.str.strip()
+                delimiter = self.sniff_delimiter(file_path)
+                data = self.read_csv_source(file_path, delimiter, fast_csv=fast_csv, chunksize=chunksize)
                 # data = pd.read_csv(file_path, converters=id_converter)
             elif ext in (".xls", ".xlsx"):
                 try:
@@ -121,11 +172,23 @@ class DataframeForAnalysis(pd.DataFrame):
                     self.load_warnings = [f"• Non-numeric input in criterion: {col}" for col in non_numeric_columns]
 
             self.data_for_analysis = ["ID", "QA Date"] + numeric_criteria
+        else:
+            super().__init__(data, *args, **kwargs)
 
-        self.gamma = kwargs.pop("gamma", None)
+        self.gamma = gamma
+        self.spc_sums = {}  # running sums of the criteria with eliminations (see running_sums)
+        self.id_index = None  # ID -> row position, built by id_positions
+        self.original_values = {}  # criterion -> values before any elimination (see ELIMINATION LAYERS)
+        self.exclusion_masks = {}  # criterion -> rows eliminated by the applied rounds
+        self.elimination_layers = []
+        self.redo_layers = []
+        self.result_cache = OrderedDict()  # (method, z, criterion, data version, n_boot) -> SPCResult
+        self.data_versions = {}  # criterion -> number of changes to its values (eliminations)
+        self.figure_pool = {}  # (method or "histogram", criterion) -> reusable GUI figure, see FIGURE POOL
+        self.sorted_cache = {}  # criterion -> (data version, sorted valid values), see sorted_criteria
 
         for col in self.columns:
-            if str(col).strip().lower() == "qa date":
+            if str(col).strip().lower() == "qa date" and not presorted:
                 self.sort_by_QA_Date()
 
         if self.gamma is None and "MedianDoseDev" in self.columns:
@@ -133,25 +196,389 @@ class DataframeForAnalysis(pd.DataFrame):
             self.gamma = np.sqrt((0.5 ** 2) / (2 ** 2) + (mean_dosedev ** 2) / (0.03 ** 2))  # for Global3%/2mm
 
     @classmethod  # This method belongs to the class (cls), not the instance (self).
-    def from_file(cls, file_path, sheet_name=0):  # sheet_name=0, overwrites by sheet_name="data" above
-        """Alternative constructor: Create an object by loading from an Excel file."""
-        return cls(file_path=file_path)
+    def from_file(cls, file_path, sheet_name=0, use_cache=True, fast_csv=False,
+                  chunksize=None):  # sheet_name=0, overwrites by sheet_name="data" above
+        """
+        Alternative constructor: Create an object by loading from an Excel file.
+        - With use_cache, an unchanged file is read back from the on-disk cache instead of being parsed.
+        - fast_csv reads CSV files with read_csv_typed (template columns only), optionally in chunks.
+        """
+        fast_csv = fast_csv and os.path.splitext(file_path)[1].lower() == ".csv"
+        if use_cache:
+            cached = cls.load_from_cache(file_path, fast_csv=fast_csv)
+            if cached is not None:
+                cached._remember_source(file_path, fast_csv)
+                return cached
+
+        df = cls(file_path=file_path, fast_csv=fast_csv, chunksize=chunksize)
+
+        if use_cache:
+            try:
+                df.save_to_cache(file_path, fast_csv=fast_csv)
+            except OSError:
+                pass  # The cache is only an accelerator; never fail a load because of it
+
+        df._remember_source(file_path, fast_csv)
+        return df
+
+    @staticmethod
+    def sniff_delimiter(file_path):
+        """Auto-detect the delimiter of a CSV file (comma, semicolon, or tab)."""
+        import csv
+        with open(file_path, "r", encoding="utf-8-sig") as f:
+            sample = f.read(2048)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+            return dialect.delimiter
+        except Exception:
+            return ","  # fallback if detection fails
+
+    @classmethod
+    def read_csv_source(cls, source, delimiter=",", fast_csv=False, chunksize=None):
+        """
+        Parse a CSV file path or text buffer with the typed reader (fast_csv) or the tolerant python parser.
+        - The typed reader falls back to the tolerant parser on non-numeric input in a criterion.
+        """
+        if fast_csv:
+            try:
+                return cls.read_csv_typed(source, delimiter, chunksize=chunksize)
+            except ValueError:
+                if hasattr(source, "seek"):
+                    source.seek(0)
+
+        data = pd.read_csv(source, sep=delimiter, converters={"ID": str}, engine="python")
+        data.columns = data.columns.str.strip()
+        return data
+
+    @classmethod
+    def read_csv_typed(cls, file_path, delimiter=",", chunksize=None, float_dtype="float64"):
+        """
+        Fast CSV reader built on the template schema.
+        - C parser, explicit dtypes, only the template columns, 'QA Date' parsed while reading.
+        - With chunksize, rows are parsed in blocks of that size, which caps the parser's peak memory.
+        - Raises ValueError if a measurement column holds non-numeric input.
+        - A UTF-8 byte order mark (Excel's "CSV UTF-8") is skipped.
+        """
+        import csv
+        if hasattr(file_path, "readline"):  # text buffer
+            header = next(csv.reader([file_path.readline().lstrip("\ufeff")], delimiter=delimiter), [])
+            file_path.seek(0)
+        else:
+            with open(file_path, "r", encoding="utf-8-sig", newline="") as f:
+                header = next(csv.reader(f, delimiter=delimiter), [])
+        raw_names = {name.strip(): name for name in header}  # stripped name -> name as written in the file
+
+        schema = {"ID": str, "Site of cancer": str, "QA Date": None}
+        schema.update({col: float_dtype for col in cls.criteria + cls.mean_max + ["MedianDoseDev"]})
+        usecols = [raw_names[col] for col in schema if col in raw_names]
+        dtype = {raw_names[col]: kind for col, kind in schema.items() if col in raw_names and kind is not None}
+        parse_dates = [raw_names["QA Date"]] if "QA Date" in raw_names else False
+
+        reader = pd.read_csv(file_path, sep=delimiter, engine="c", encoding="utf-8-sig", usecols=usecols,
+                             dtype=dtype, parse_dates=parse_dates, chunksize=chunksize)
+        data = pd.concat(reader, ignore_index=True) if chunksize else reader
+        data.columns = data.columns.str.strip()
+
+        if "ID" in data.columns:
+            data["ID"] = data["ID"].fillna("")  # same as the str converter of the default parser
+        return data
+
+    # ===================== FILE CACHE ===================== #
+
+    cache_dir = os.path.join(os.path.expanduser("~"), ".gpr_spc_cache")
+    cache_version = 1
+    cached_attributes = ["site_of_cancer", "load_warnings", "present_criteria", "missing_criteria",
+                         "data_for_analysis"]
+
+    @staticmethod
+    def file_fingerprint(file_path):
+        """
+        Identity of an input file: absolute path, size, modification time and content hash.
+        """
+        stat = os.stat(file_path)
+        content_hash = hashlib.blake2b(digest_size=20)
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                content_hash.update(chunk)
+        return {
+            "path": os.path.abspath(file_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "hash": content_hash.hexdigest(),
+        }
+
+    @classmethod
+    def _cache_entry(cls, file_path, fast_csv=False):
+        """Cache folder of a file (one entry per path and ingest mode; a changed file overwrites its entry)."""
+        path_key = f"{os.path.abspath(file_path)}|{'typed' if fast_csv else 'full'}"
+        return os.path.join(cls.cache_dir, hashlib.blake2b(path_key.encode("utf-8"), digest_size=16).hexdigest())
+
+    def save_to_cache(self, file_path, fast_csv=False):
+        """
+        Store the validated, typed and QA-Date-sorted frame in the cache.
+        - One .npy file per column so that reads can be memory-mapped.
+        - Text columns are stored as fixed-width unicode; mixed columns fall back to pickled object arrays.
+        """
+        entry = self._cache_entry(file_path, fast_csv)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_entry = tempfile.mkdtemp(dir=self.cache_dir)
+
+        try:
+            columns = []
+            for i, col in enumerate(self.columns):
+                series = self[col]
+                if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_dtype(series):
+                    values, kind = series.to_numpy(), "native"
+                elif pd.api.types.infer_dtype(series, skipna=False) == "string":
+                    values, kind = series.to_numpy(dtype=str), "text"
+                else:
+                    values, kind = series.to_numpy(dtype=object), "object"
+                np.save(os.path.join(tmp_entry, f"{i}.npy"), values, allow_pickle=(kind == "object"))
+                columns.append({"name": str(col), "kind": kind})
+
+            meta = {
+                "version": self.cache_version,
+                "fingerprint": self.file_fingerprint(file_path),
+                "columns": columns,
+                "gamma": None if self.gamma is None else float(self.gamma),
+                "attributes": {name: getattr(self, name, None) for name in self.cached_attributes},
+            }
+            with open(os.path.join(tmp_entry, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+
+            shutil.rmtree(entry, ignore_errors=True)
+            os.replace(tmp_entry, entry)
+        finally:
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+
+    @classmethod
+    def load_from_cache(cls, file_path, fast_csv=False):
+        """
+        Rebuild the frame of an unchanged file from the cache, or return None on a miss.
+        """
+        entry = cls._cache_entry(file_path, fast_csv)
+        try:
+            with open(os.path.join(entry, "meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["version"] != cls.cache_version:
+                return None
+
+            stat = os.stat(file_path)
+            cached = meta["fingerprint"]
+            if cached["size"] != stat.st_size or cached["mtime_ns"] != stat.st_mtime_ns:
+                return None
+            if cached != cls.file_fingerprint(file_path):
+                return None
+
+            data = {}
+            for i, col in enumerate(meta["columns"]):
+                path = os.path.join(entry, f"{i}.npy")
+                if col["kind"] == "object":
+                    data[col["name"]] = np.load(path, allow_pickle=True)
+                else:
+                    data[col["name"]] = np.load(path, mmap_mode="r")
+        except (OSError, ValueError, KeyError):
+            return None
+
+        df = cls(data=pd.DataFrame(data), gamma=meta["gamma"], presorted=True)
+        for name, value in meta["attributes"].items():
+            setattr(df, name, value)
+        return df
+
+    @classmethod
+    def clear_cache(cls):
+        """Remove every cached file."""
+        shutil.rmtree(cls.cache_dir, ignore_errors=True)
+
+    # ===================== INCREMENTAL REFRESH ===================== #
+
+    def _remember_source(self, file_path, fast_csv=False):
+        """Record how much of the source file is loaded: bytes for CSV, data rows for Excel."""
+        self.source_path = file_path
+        self.source_fast_csv = fast_csv
+        self.source_offset = os.path.getsize(file_path)
+        self.source_rows = len(self)
+
+    def _read_appended_rows(self):
+        """
+        Parse only the rows added to the source file since it was loaded.
+        - Returns None when the file was not simply appended to (truncated, rewritten header, ...).
+        """
+        file_path = self.source_path
+        ext = os.path.splitext(file_path)[1].lower()
+
+        if ext == ".csv":
+            size = os.path.getsize(file_path)
+            if size < self.source_offset:
+                return None
+            with open(file_path, "rb") as f:
+                header_line = f.readline()
+                f.seek(self.source_offset - 1)
+                previous_end = f.read(1)
+                appended = f.read()
+            if previous_end != b"\n":
+                return None
+            text = (header_line + appended).decode("utf-8-sig")
+            delimiter = self.sniff_delimiter(file_path)
+            return self.read_csv_source(io.StringIO(text), delimiter, fast_csv=self.source_fast_csv)
+
+        try:
+            return pd.read_excel(file_path, sheet_name="data", converters={"ID": str},
+                                 skiprows=range(1, self.source_rows + 1))
+        except ValueError:
+            return None
+
+    def merge_sorted_rows(self, new_rows):
+        """
+        Merge rows into the QA-Date order in linear time, without re-sorting the whole frame.
+        - Only the new rows are sorted; their positions come from a binary search in the sorted dates.
+        - Rows with the same date keep the existing rows first. Missing dates stay at the bottom.
+        - Returns the merged frame and the take order: merged row i is row order[i] of the
+          existing rows followed by the sorted new rows.
+        """
+        new_rows = new_rows.copy()
+        new_rows["QA Date"] = pd.to_datetime(new_rows["QA Date"], errors="coerce")
+        new_rows = new_rows.sort_values(by="QA Date", kind="stable", na_position="last")
+
+        dates = self["QA Date"].to_numpy()
+        n_dated = int(self["QA Date"].notna().sum())  # NaT rows are at the bottom
+        new_dates = new_rows["QA Date"].to_numpy().astype(dates.dtype)
+        positions = np.full(len(new_rows), len(self))
+        has_date = ~np.isnat(new_dates)
+        positions[has_date] = np.searchsorted(dates[:n_dated], new_dates[has_date], side="right")
+
+        # Final slot of every new row, and the old rows fill the remaining slots in order
+        is_new = np.zeros(len(self) + len(new_rows), dtype=bool)
+        is_new[positions + np.arange(len(new_rows))] = True
+        order = np.empty(is_new.size, dtype=np.intp)
+        order[is_new] = len(self) + np.arange(len(new_rows))
+        order[~is_new] = np.arange(len(self))
+
+        combined = pd.concat([pd.DataFrame(self), new_rows.reindex(columns=self.columns)], ignore_index=True)
+        return combined.take(order).reset_index(drop=True), order
+
+    def refresh(self):
+        """
+        Load the QA records appended to the source file since the last load or refresh.
+        - CSV: parses only the bytes after the previous end of file.
+        - Excel: takes the rows after the previous row count.
+        - New rows are merged into the sorted data (merge_sorted_rows) and the site list and
+          gamma are updated. Eliminated values stay eliminated.
+        - Returns self when nothing was appended, a new DataframeForAnalysis otherwise, and a
+          full reload when the file changed in any other way.
+        """
+        if os.path.splitext(self.source_path)[1].lower() == ".csv" \
+                and os.path.getsize(self.source_path) == self.source_offset:
+            return self
+
+        new_rows = self._read_appended_rows()
+        if new_rows is not None and new_rows.empty:
+            self._remember_source(self.source_path, self.source_fast_csv)
+            return self
+        if new_rows is not None:
+            new_rows.columns = new_rows.columns.astype(str).str.strip()
+            # A changed layout or non-numeric input in a criterion needs the full validation of a reload
+            if list(new_rows.columns) != [col for col in self.columns if col in new_rows.columns] \
+                    or any(not pd.api.types.is_numeric_dtype(new_rows[col])
+                           for col in self.data_for_analysis[2:] if col in new_rows.columns):
+                new_rows = None
+        self.clear_result_cache()  # the data moves to a new frame
+        self.close_figures()
+        if new_rows is None:
+            return self.from_file(self.source_path, fast_csv=self.source_fast_csv)
+
+        if "ID" in new_rows.columns:
+            new_rows["ID"] = new_rows["ID"].astype(str)
+        if "Site of cancer" in new_rows.columns:
+            new_rows["Site of cancer"] = new_rows["Site of cancer"].astype(str)
+
+        merged, order = self.merge_sorted_rows(new_rows)
+        df = type(self)(data=merged, presorted=True)
+        for name in self.cached_attributes:
+            setattr(df, name, getattr(self, name, None))
+        if "Site of cancer" in df.columns:
+            df.site_of_cancer = sorted(df["Site of cancer"].dropna().unique().tolist())
+        self._carry_eliminations(df, order)
+
+        df._remember_source(self.source_path, self.source_fast_csv)
+        if not any(mask.any() for mask in df.exclusion_masks.values()):  # the cache holds the file as read
+            try:
+                df.save_to_cache(self.source_path, fast_csv=self.source_fast_csv)
+            except OSError:
+                pass
+        return df
 
     def round_half_up(self, value, ndigits=0):
         rounding_format = f'1.{"0" * ndigits}'
         return float(Decimal(str(value)).quantize(Decimal(rounding_format), rounding=ROUND_HALF_UP))
 
+    def round_half_up_array(self, values, ndigits=0):
+        """
+        Vectorized round_half_up: gives the same result as the Decimal path for every element.
+        - Accepts arrays, Series and DataFrames and returns the same type.
+        - Ties such as 2.675 are decided on the float itself: str(value) is always on the same
+          side of the decimal tie as the value, or equal to the tie when the value is its nearest double.
+        """
+        arr = np.asarray(values, dtype=float)
+        scale = 10.0 ** ndigits
+
+        with np.errstate(invalid="ignore", over="ignore"):
+            magnitude = np.abs(arr)
+            scaled = magnitude * scale
+            lower = np.floor(scaled)
+            rounded = np.floor(scaled + 0.5)
+
+            # magnitude * scale is only exact up to a few ulps, far below this margin
+            near_tie = np.abs(scaled - lower - 0.5) <= 2.0 ** -40 * np.maximum(scaled, 1.0)
+            tie = (lower + 0.5) / scale  # nearest double to the decimal tie
+            rounded = np.where(near_tie, lower + (magnitude >= tie), rounded)
+            result = np.copysign(rounded / scale, arr)
+
+            # Beyond this magnitude several decimals share one double, so keep the Decimal path
+            huge = np.isfinite(scaled) & (scaled >= 2.0 ** 44)
+
+        if huge.any():
+            result[huge] = [self.round_half_up(value, ndigits) for value in arr[huge]]
+
+        if isinstance(values, pd.DataFrame):
+            return pd.DataFrame(result, index=values.index, columns=values.columns)
+        if isinstance(values, pd.Series):
+            return pd.Series(result, index=values.index, name=values.name)
+        return result
+
     def get_z_info(self, confidence_level):
+        """
+        alpha and two-sided z value of a confidence level ("97.5%", or a fraction such as 0.975).
+        - A number without '%' is a fraction up to 1 ("0.975") and a percentage above ("97.5").
+        - The levels of z_table keep their tabulated z values.
+        - Any other level is computed from the normal quantile once and cached in z_cache.
+        - Raises ValueError for levels outside confidence_range.
+        """
         if isinstance(confidence_level, float):
+            level = confidence_level
             confidence_level = f"{round(confidence_level * 100, 2)}%"
-        try:
+        else:
+            text = str(confidence_level).strip()
+            try:
+                level = float(text.rstrip("%"))
+            except ValueError:
+                level = np.nan
+            if text.endswith("%") or level > 1:
+                level /= 100
+        if confidence_level in self.z_table:
             info = self.z_table[confidence_level]
             return info["alpha"], info["z_score"]
-        except KeyError:
-            raise ValueError(
-                f"Unsupported confidence level '{confidence_level}'. "
-                f"Try one of: {list(self.z_table.keys())}"
-            )
+
+        if level not in self.z_cache:
+            low, high = self.confidence_range
+            if not low <= level <= high:
+                raise ValueError(
+                    f"Unsupported confidence level '{confidence_level}'. "
+                    f"Give a level between {low:.0%} and {high:.2%}, e.g. one of: {list(self.z_table.keys())}"
+                )
+            alpha = round(1 - level, 12)
+            self.z_cache[level] = (alpha, float(ndtri(1 - alpha / 2)))
+        return self.z_cache[level]
 
     def sort_by_QA_Date(self):
         """
@@ -168,6 +595,8 @@ class DataframeForAnalysis(pd.DataFrame):
 
         # Reset index
         self.reset_index(drop=True, inplace=True)
+        self.id_index = None  # row positions changed
+        self.clear_result_cache()
 
     # ===================== GUI METHODS ===================== #
 
@@ -207,8 +636,7 @@ class DataframeForAnalysis(pd.DataFrame):
         stats_df = numeric_df.describe()
 
         # Apply custom rounding
-        for col in stats_df.columns:
-            stats_df[col] = stats_df[col].apply(lambda x: self.round_half_up(x, ndigits))
+        stats_df = self.round_half_up_array(stats_df, ndigits)
 
         return stats_df.to_string()
 
@@ -222,489 +650,2193 @@ class DataframeForAnalysis(pd.DataFrame):
         sns.set_style("darkgrid")
         figs = []
 
-        for feature in columns:
-            fig, ax = plt.subplots(figsize=(8, 4))
-            sns.histplot(numeric_data[feature], kde=True, color='skyblue', ax=ax)
-            ax.set_title(
-                f"{feature} | Skewness: {round(numeric_data[feature].skew(), 2)} | Kurtosis: {round(numeric_data[feature].kurt(), 2)}"
-            )
-            ax.yaxis.set_major_locator(mticker.MaxNLocator(integer=True))
-            ax.set_ylabel('Counts', fontsize=10)
-            x_label = "Mean γ" if feature == "Global Mean Gamma Index" else "GPR(%)"
-            ax.set_xlabel(x_label, fontsize=10)
-            fig.tight_layout()
+        # Skewness and kurtosis of every column from one sort of the matrix (see criteria_normality)
+        shape = self.normality_table(None, columns, self.sorted_criteria(columns))
 
+        for feature in columns:
             if pdf is not None:
+                fig, ax = plt.subplots(figsize=(8, 4))
+                self._draw_histogram(ax, numeric_data[feature], shape.loc[feature])
                 pdf.savefig(fig, dpi=300, bbox_inches="tight")
                 plt.close(fig)
             else:
-                figs.append(fig)
+                figs.append(self.histogram_figure(feature, shape.loc[feature]))
 
         if return_fig:
             return figs if figs else None
 
+    def histogram_figure(self, feature, shape=None):
+        """
+        GUI histogram of one column, drawn on its pooled figure (see FIGURE POOL).
+        `shape` is the column's row of normality_table; computed here when not given.
+        """
+        if shape is None:
+            shape = self.normality_table(None, [feature], self.sorted_criteria([feature])).loc[feature]
+        sns.set_style("darkgrid")
+        fig, ax = self._pooled_axes(("histogram", feature))
+        self._draw_histogram(ax, self[feature], shape)
+        return fig
+
+    @staticmethod
+    def _draw_histogram(ax, values, shape):
+        feature = values.name
+        sns.histplot(values, kde=True, color='skyblue', ax=ax)
+        ax.set_title(
+            f"{feature} | Skewness: {round(shape['Skewness'], 2)} | Kurtosis: {round(shape['Kurtosis'], 2)}"
+        )
+        ax.yaxis.set_major_locator(mticker.MaxNLocator(integer=True))
+        ax.set_ylabel('Counts', fontsize=10)
+        x_label = "Mean γ" if feature == "Global Mean Gamma Index" else "GPR(%)"
+        ax.set_xlabel(x_label, fontsize=10)
+        ax.figure.tight_layout()
+
     def run_anderson_test(self, selected_columns=None):
         """
         Perform the Anderson-Darling test for normality on numerical GPR columns.
         - If selected_columns is provided, only those are tested.
         - Uses the 5% significance level to determine normality.
+        - All columns are tested together by normality_tests, which also adds approximate p-values,
+          the Shapiro-Francia W' and the D'Agostino K² test.
         - Returns a list of dictionaries suitable for GUI Treeview display.
         """
-        data_GPRs_numerical = self[self.columns.intersection(self.data_for_analysis)].select_dtypes(include=['number'])
-
-        if selected_columns is not None:
-            data_GPRs_numerical = data_GPRs_numerical[selected_columns]
+        table = self.normality_tests(selected_columns)
 
         results = []
-        for column in data_GPRs_numerical.columns:
-            valid_data = data_GPRs_numerical[column].dropna()
-            result = anderson(valid_data, dist='norm')
-            is_normal = result.statistic < result.critical_values[2]  # 5% significance level
+        for column, row in table.iterrows():
             results.append({
                 'GPR': column,
-                'Statistic': round(result.statistic, 3),
-                'Critical Value (5%)': round(result.critical_values[2], 3),
-                'Normality': 'Likely Normal' if is_normal else 'Not Normal'
+                'Statistic': round(row["A² Statistic"], 3),
+                'Critical Value (5%)': round(row["Critical Value (5%)"], 3),
+                'Normality': row["Normality"],
+                'A² p-value': round(row["A² p-value"], 4),
+                "Shapiro-Francia W'": round(row["Shapiro-Francia W'"], 4),
+                "W' p-value": round(row["W' p-value"], 4),
+                'K² p-value': round(row["K² p-value"], 4),
             })
 
         df_results = pd.DataFrame(results)
 
         return df_results.to_dict(orient='records')
 
+    def normality_tests(self, selected_columns=None):
+        """
+        Batched normality tests of the numerical GPR columns (or `selected_columns`), see normality_table.
+        """
+        data_GPRs_numerical = self[self.columns.intersection(self.data_for_analysis)].select_dtypes(include=['number'])
+
+        if selected_columns is not None:
+            data_GPRs_numerical = data_GPRs_numerical[selected_columns]
+
+        columns = data_GPRs_numerical.columns
+        return self.normality_table(None, columns, self.sorted_criteria(columns))
+
+    def normality_tests_by_site(self, selected_columns=None, max_workers=None):
+        """
+        normality_tests for every site of cancer, one site per worker process (see compute_spc_by_site).
+        Returns one table with a row per site and criterion.
+        """
+        if selected_columns is None:
+            selected_columns = self.present_criteria
+        selected_columns = list(selected_columns)
+
+        sites, order, bounds = self.site_blocks()
+        X = self[selected_columns].to_numpy(dtype=float)[order]
+        tasks = [(start, stop, selected_columns) for start, stop in zip(bounds[:-1], bounds[1:])]
+        tables = self._map_sites(_site_normality_rows, X, tasks, max_workers)
+
+        table = pd.concat([site_table.reset_index() for site_table in tables], ignore_index=True)
+        table.insert(0, "Site of cancer", np.repeat(np.asarray(sites), [len(site_table) for site_table in tables]))
+        return table
+
+    @classmethod
+    def normality_table(cls, X, columns, sorted_X=None):
+        """criteria_normality of the matrix `X` as a table indexed by column, with the A² verdict at 5%."""
+        table = pd.DataFrame(cls.criteria_normality(X, sorted_X), index=pd.Index(list(columns), name="GPR Column"))
+        table["Normality"] = np.where(table["A² Statistic"] < table["Critical Value (5%)"],
+                                      "Likely Normal", "Not Normal")
+        return table
+
+    @classmethod
+    def criteria_normality(cls, X, sorted_X=None):
+        """
+        Normality tests of every column of a NaN-aware matrix, computed together from one sort.
+        - `sorted_X`, the matrix already sorted by column (see sorted_criteria), replaces `X` and its sort.
+        - Anderson-Darling A² as scipy.stats.anderson (normal, fitted mean and sd), its 5% critical
+          value and the D'Agostino-Stephens p-value approximation.
+        - Shapiro-Francia W' (a Shapiro-Wilk approximation) with Royston's p-value (5 ≤ n ≤ 5000).
+        - D'Agostino skewness and Anscombe-Glynn kurtosis z-scores and the omnibus K², as
+          scipy.stats.skewtest / kurtosistest / normaltest.
+        - Skewness and kurtosis are also given bias-corrected, as pandas Series.skew() / kurt().
+        """
+        if sorted_X is None:
+            X = np.asarray(X, dtype=float)
+            if X.ndim == 1:
+                X = X[:, None]
+            sorted_X = np.sort(X, axis=0)
+        S = sorted_X  # NaNs sort last: each column starts with its values in ascending order
+        n = (~np.isnan(S)).sum(axis=0).astype(float)
+        rank = np.arange(1, S.shape[0] + 1, dtype=float)[:, None]
+        inside = rank <= n
+
+        with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+            mean = np.nansum(S, axis=0) / n
+            moments = cls.central_moments(S, n, mean, kurtosis=True)
+            m2, m3, m4 = moments["m2"], moments["m3"], moments["m4"]
+            g1 = cls.skewness(m2, m3, mean)
+            b2 = m4 / m2 ** 2
+            constant = np.isnan(g1) & (n > 0)
+
+            # Anderson-Darling: ascending log CDF against the descending log survival function
+            w = (S - mean) / np.sqrt(m2 * n / (n - 1))
+            logsf_desc = np.take_along_axis(log_ndtr(-w), np.clip(n - rank, 0, None).astype(int), axis=0)
+            terms = (2 * rank - 1) / n * (log_ndtr(w) + logsf_desc)
+            A2 = -n - np.sum(np.where(inside, terms, 0.0), axis=0)
+            correction = 1 + 0.75 / n + 2.25 / n ** 2
+            critical = np.round(0.752 / correction, 3)  # scipy's 5% value for the normal case
+            a = A2 * correction
+            A2_p = np.select([a < 0.2, a < 0.34, a < 0.6],
+                             [1 - np.exp(-13.436 + 101.14 * a - 223.73 * a ** 2),
+                              1 - np.exp(-8.318 + 42.796 * a - 59.938 * a ** 2),
+                              np.exp(0.9177 - 4.279 * a - 1.38 * a ** 2)],
+                             np.exp(1.2937 - 5.709 * a + 0.0186 * a ** 2))
+
+            # Shapiro-Francia: squared correlation of the sorted values with Blom's normal scores
+            scores = np.where(inside, ndtri((rank - 0.375) / (n + 0.25)), 0.0)
+            dev = np.where(inside, S - mean, 0.0)
+            W = np.sum(scores * dev, axis=0) ** 2 / (np.sum(scores ** 2, axis=0) * np.sum(dev ** 2, axis=0))
+            u = np.log(n)
+            v = np.log(u)
+            z_W = (np.log(1 - W) - (-1.2725 + 1.0521 * (v - u))) / (1.0308 - 0.26758 * (v + 2 / u))
+            W_p = np.where((n >= 5) & (n <= 5000), ndtr(-z_W), np.nan)
+
+            # D'Agostino skewness test (n >= 8)
+            n8 = np.where(n < 8, np.nan, n)
+            y = g1 * np.sqrt((n8 + 1) * (n8 + 3) / (6.0 * (n8 - 2)))
+            beta2 = 3.0 * (n8 ** 2 + 27 * n8 - 70) * (n8 + 1) * (n8 + 3) / ((n8 - 2.0) * (n8 + 5) * (n8 + 7) * (n8 + 9))
+            W2 = -1 + np.sqrt(2 * (beta2 - 1))
+            alpha = np.sqrt(2.0 / (W2 - 1))
+            y = np.where(y == 0, 1.0, y)
+            Z_skew = np.log(y / alpha + np.sqrt((y / alpha) ** 2 + 1)) / np.sqrt(0.5 * np.log(W2))
+
+            # Anscombe-Glynn kurtosis test (n >= 5)
+            n5 = np.where(n < 5, np.nan, n)
+            E = 3.0 * (n5 - 1) / (n5 + 1)
+            varb2 = 24.0 * n5 * (n5 - 2) * (n5 - 3) / ((n5 + 1) ** 2 * (n5 + 3) * (n5 + 5))
+            x = (b2 - E) / np.sqrt(varb2)
+            sqrtbeta1 = (6.0 * (n5 ** 2 - 5 * n5 + 2) / ((n5 + 7) * (n5 + 9))
+                         * np.sqrt(6.0 * (n5 + 3) * (n5 + 5) / (n5 * (n5 - 2) * (n5 - 3))))
+            A = 6.0 + 8.0 / sqrtbeta1 * (2.0 / sqrtbeta1 + np.sqrt(1 + 4.0 / sqrtbeta1 ** 2))
+            denom = 1 + x * np.sqrt(2 / (A - 4.0))
+            term2 = np.sign(denom) * np.where(denom == 0, np.nan, ((1 - 2.0 / A) / np.abs(denom)) ** (1 / 3))
+            Z_kurt = (1 - 2 / (9.0 * A) - term2) / np.sqrt(2 / (9.0 * A))
+            K2 = Z_skew ** 2 + Z_kurt ** 2
+
+            # Bias-corrected sample skewness and excess kurtosis (pandas: 0 for constant data)
+            G1 = np.where(n > 2, np.sqrt(n * (n - 1)) / (n - 2) * g1, np.nan)
+            G2 = np.where(n > 3, (n - 1) / ((n - 2) * (n - 3)) * ((n + 1) * (b2 - 3) + 6), np.nan)
+        G1[constant & (n > 2)] = 0.0
+        G2[constant & (n > 3)] = 0.0
+
+        return {
+            "Counts": n.astype(int),
+            "Skewness": G1,
+            "Kurtosis": G2,
+            "A² Statistic": A2,
+            "Critical Value (5%)": critical,
+            "A² p-value": A2_p,
+            "Shapiro-Francia W'": W,
+            "W' p-value": W_p,
+            "Skewness Z": Z_skew,
+            "Kurtosis Z": Z_kurt,
+            "K² Statistic": K2,
+            "K² p-value": np.exp(-K2 / 2),  # chi-square survival function with 2 degrees of freedom
+        }
+
+    x_chart_max_points = 4000  # plot_x_chart: longer series are drawn decimated, see minmax_decimate
+    x_chart_pick_radius = 6  # pixels: hover and click reach of the I-chart points, see _nearest_point
+
+    x_chart_limit_styles = {  # plot_x_chart: limit -> line style
+        "CL": dict(color='green', linestyle='--', linewidth=2.5),
+        "UCL": dict(color='red', linestyle='--', linewidth=2.3),
+        "LCL": dict(color='red', linestyle='--', linewidth=2.5),
+        "USL": dict(color='orange', linestyle='--', linewidth=2.0),
+        "LSL": dict(color='orange', linestyle='--', linewidth=2.0),
+    }
+
     def plot_x_chart(self, pdf=None, column=None, CL=None, UCL=None, LCL=None,
                      USL=None, LSL=None, data_to_plot=None, out_of_control=None,
-                     confidence_level=None, method_name=None):
+                     confidence_level=None, method_name=None, run_rule_points=None,
+                     chart_name=None, ylabel=None, data_label="GPR Data", title=None, max_points=None):
         """
         Plots X-Chart.
+        `run_rule_points` (index labels) are marked as run-rule violations.
+        `chart_name` (or a whole `title`), `ylabel` and `data_label` retitle it for the EWMA, CUSUM
+        and T² statistics.
+        A data trace longer than `max_points` (default x_chart_max_points, 0 = never) is drawn
+        decimated; the out-of-control and run-rule marks are always exact, and zooming in brings
+        the full detail back.
+        Hovering over (or clicking) a point shows its ID, QA date and value.
         """
+        chart = self._x_chart_data(column=column, CL=CL, UCL=UCL, LCL=LCL, USL=USL, LSL=LSL,
+                                   data_to_plot=data_to_plot, out_of_control=out_of_control,
+                                   method_name=method_name, run_rule_points=run_rule_points,
+                                   chart_name=chart_name, ylabel=ylabel, data_label=data_label, title=title,
+                                   max_points=max_points)
+        sns.set_style("darkgrid")
+        fig, ax = plt.subplots(figsize=(8, 4))
+        self._draw_x_chart(ax, chart, {})
+
+        if pdf is not None:
+            pdf.savefig(fig)
+            plt.close(fig)
+            return None
+        else:
+            return fig
+
+    def _x_chart_data(self, column=None, CL=None, UCL=None, LCL=None, USL=None, LSL=None,
+                      data_to_plot=None, out_of_control=None, confidence_level=None, method_name=None,
+                      run_rule_points=None, chart_name=None, ylabel=None, data_label="GPR Data", title=None,
+                      max_points=None):
+        """Everything an X-chart shows (arguments of plot_x_chart), at the 0-based plot positions."""
         data_to_plot = data_to_plot.reset_index(drop=False)
         index_map = data_to_plot["index"]  # Keep original indices to recover ID later
-        y_values = data_to_plot[column]
+        positions = pd.Index(index_map)
 
-        sns.set_style("darkgrid")
-        fig, ax = plt.subplots(figsize=(8, 4))
-        ax.plot(data_to_plot.index, y_values.values, marker='o', linestyle='-', color='b', label="GPR Data")
-        ax.axhline(y=CL, color='green', linestyle='--', linewidth=2.5, label="CL")
-        ax.axhline(y=UCL, color='red', linestyle='--', linewidth=2.3, label="UCL")
-        ax.axhline(y=LCL, color='red', linestyle='--', linewidth=2.5, label="LCL")
+        limits = {"CL": CL, "UCL": UCL, "LCL": LCL}
         if USL is not None:
-            ax.axhline(y=USL, color='orange', linestyle='--', linewidth=2.0, label="USL")
+            limits["USL"] = USL
         if LSL is not None:
-            ax.axhline(y=LSL, color='orange', linestyle='--', linewidth=2.0, label="LSL")
-        # Map out-of-control positions to new 0-based index
-        outlier_positions = [data_to_plot.index[data_to_plot["index"] == idx][0] for idx in out_of_control]
-        ax.scatter(outlier_positions, y_values.loc[outlier_positions],
-                   color='red', marker='o', s=100, edgecolors='black', zorder=3, label="Out-of-Control")
+            limits["LSL"] = LSL
+        rule_positions = None
+        if run_rule_points is not None and len(run_rule_points):
+            rule_positions = positions.get_indexer(run_rule_points)
+        if ylabel is None:
+            ylabel = "GPR (%)" if column in self.GPRs_n_Names else "Mean γ"
+        if title is None:
+            title = self.x_chart_title(column, method_name, chart_name)
+
+        return {
+            "x": data_to_plot.index,
+            "y": data_to_plot[column],
+            "index_map": index_map,
+            # float positions and values for picking points, converted once per chart (see _nearest_point)
+            "x_float": np.asarray(data_to_plot.index, dtype=float),
+            "y_float": data_to_plot[column].to_numpy(dtype=float),
+            "limits": limits,
+            "outliers": positions.get_indexer(out_of_control),  # Map out-of-control positions to new 0-based index
+            "rules": rule_positions,
+            "ylabel": ylabel,
+            "title": title,
+            "data_label": data_label,
+            "max_points": self.x_chart_max_points if max_points is None else max_points,
+            # charts of the same layout have the same artists and legend, see _update_x_chart
+            "layout": (tuple((name, np.ndim(value)) for name, value in limits.items()),
+                       rule_positions is not None, data_label),
+        }
+
+    @staticmethod
+    def minmax_decimate(values, max_points, start=0, stop=None):
+        """
+        Positions of the points of values[start:stop] kept by a min/max decimation to about `max_points`.
+        - The range is cut into max_points / 2 equal buckets (about one per pixel column) and the
+          minimum and maximum of every bucket are kept, with the first and last points, in order:
+          every peak and dip of the trace survives.
+        - Ranges of at most `max_points` values (or max_points = 0) are returned whole.
+        """
+        stop = len(values) if stop is None else stop
+        n = stop - start
+        if not max_points or n <= max_points:
+            return np.arange(start, stop)
+        buckets = max(max_points // 2, 1)
+        segment = np.asarray(values[start:stop], dtype=float)
+        ids = (np.arange(n) * buckets) // n
+        order = np.lexsort((segment, ids))  # by bucket, then by value
+        first = np.searchsorted(ids[order], np.arange(buckets))
+        last = np.append(first[1:], n) - 1
+        return np.unique(np.concatenate([order[first], order[last], [0, n - 1]])) + start
+
+    def _trace_positions(self, chart, xlim=None):
+        """Positions of the data trace drawn for `chart`, decimated to the visible x range `xlim`."""
+        n = len(chart["y"])
+        if xlim is None:
+            return self.minmax_decimate(chart["y"].to_numpy(), chart["max_points"])
+        # one point beyond each edge keeps the line running to the frame
+        start = min(max(int(np.floor(min(xlim))) - 1, 0), n)
+        stop = max(min(int(np.ceil(max(xlim))) + 2, n), start)
+        return self.minmax_decimate(chart["y"].to_numpy(), chart["max_points"], start, stop)
+
+    @staticmethod
+    def _nearest_point(ax, chart, event, radius):
+        """
+        Position of the chart point nearest to a mouse event, within `radius` pixels, or None.
+        - The x positions are sorted, so the points under the ±radius pixel columns are found by
+          binary search; only those are measured, in display coordinates.
+        - Uses the float arrays kept on the chart, so a mouse event allocates nothing of the trace's size.
+        """
+        if event.x is None or event.y is None:
+            return None
+        x = chart["x_float"]
+        (x0, _), (x1, _) = ax.transData.inverted().transform([(event.x - radius, event.y),
+                                                              (event.x + radius, event.y)])
+        start = np.searchsorted(x, min(x0, x1), side="left")
+        stop = np.searchsorted(x, max(x0, x1), side="right")
+        if start >= stop:
+            return None
+        y = chart["y_float"][start:stop]
+        points = ax.transData.transform(np.column_stack([x[start:stop], y]))
+        distance = np.hypot(points[:, 0] - event.x, points[:, 1] - event.y)
+        if np.isnan(distance).all():
+            return None
+        nearest = int(np.nanargmin(distance))
+        return start + nearest if distance[nearest] <= radius else None
+
+    def _point_label(self, chart, i):
+        """ID, QA date and value of the point at position i, for the hover annotation."""
+        true_index = chart["index_map"][i]
+        lines = [f"ID: {self.loc[true_index, 'ID']}"]
+        if "QA Date" in self.columns:
+            date = self.loc[true_index, "QA Date"]
+            lines.append(f"Date: {pd.Timestamp(date).date() if pd.notna(date) else '-'}")
+        lines.append(f"Value: {chart['y'].iloc[i]}")
+        return "\n".join(lines)
+
+    @staticmethod
+    def x_chart_title(column, method_name=None, chart_name=None):
+        return f"{method_name}: I-Chart for {column}" if chart_name is None else f"{chart_name} for {column}"
+
+    def _draw_x_chart(self, ax, chart, artists):
+        """Draw an X-chart on `ax`, keeping its artists in `artists` for later in-place updates."""
+        fig = ax.figure
+        x, y_values = chart["x"], chart["y"]
+
+        def draw_limit(y, **style):
+            if np.ndim(y) == 0:
+                return ax.axhline(y=y, **style)
+            else:  # rolling limits: one value per observation
+                return ax.plot(x, np.asarray(y, dtype=float), drawstyle="steps-mid", **style)[0]
+
+        artists["layout"] = chart["layout"]
+        shown = self._trace_positions(chart)
+        artists["data"] = ax.plot(np.asarray(x)[shown], y_values.values[shown], marker='o', linestyle='-',
+                                  color='b', label=chart["data_label"])[0]
+        artists["limits"] = {name: draw_limit(value, label=name, **self.x_chart_limit_styles[name])
+                             for name, value in chart["limits"].items()}
+        outlier_positions = chart["outliers"]
+        artists["outliers"] = ax.scatter(outlier_positions, y_values.loc[outlier_positions], color='red', marker='o',
+                                         s=100, edgecolors='black', zorder=3, label="Out-of-Control")
+        if chart["rules"] is not None:
+            artists["rules"] = ax.scatter(chart["rules"], y_values.loc[chart["rules"]], color='orange', marker='^',
+                                          s=70, edgecolors='black', zorder=4, label="Run Rule")
 
         ax.set_xlabel("Time Ordered Observations")
-        ylabel = "GPR (%)" if column in self.GPRs_n_Names else "Mean γ"
-        ax.set_ylabel(ylabel)
-        ax.set_title(f"{method_name}: I-Chart for {column}")
+        ax.set_ylabel(chart["ylabel"])
+        ax.set_title(chart["title"])
         ax.legend(loc='upper left', fontsize=8)
         ax.grid(True)
-
-        def on_click(event):
-            if event.inaxes and event.xdata is not None and event.ydata is not None:
-                for i, y in enumerate(y_values):
-                    if abs(event.xdata - i) < 0.25 and abs(event.ydata - y) < 0.25:
-                        true_index = index_map[i]
-                        patient_id = self.loc[true_index, "ID"]
-                        messagebox.showinfo("Point Info", f"ID: {patient_id}\nValue: {y}")
-                        break
-
-        fig.canvas.mpl_connect("button_press_event", on_click)
+        artists["ax"] = ax
+        artists["chart"] = chart
+
+        # Hover (or click) annotation: an animated artist blitted over the saved background of the
+        # last full draw, so showing it never redraws the chart and never blocks the GUI
+        artists["annotation"] = ax.annotate("", xy=(0, 0), xytext=(12, 12), textcoords="offset points",
+                                            bbox=dict(boxstyle="round", fc="white", alpha=0.9), fontsize=8,
+                                            animated=True, visible=False, zorder=5)
+
+        def blit_annotation(canvas):
+            background = artists.get("background")
+            if background is None or not getattr(canvas, "supports_blit", False):
+                return
+            canvas.restore_region(background)
+            if artists["annotation"].get_visible():
+                artists["ax"].draw_artist(artists["annotation"])
+            canvas.blit(canvas.figure.bbox)
+
+        def on_draw(event):
+            if getattr(event.canvas, "supports_blit", False):
+                artists["background"] = event.canvas.copy_from_bbox(event.canvas.figure.bbox)
+                blit_annotation(event.canvas)
+
+        def on_point(event):
+            annotation = artists["annotation"]
+            i = None
+            if event.inaxes is artists["ax"]:
+                i = self._nearest_point(artists["ax"], artists["chart"], event, self.x_chart_pick_radius)
+            if i is None:
+                if annotation.get_visible():
+                    annotation.set_visible(False)
+                    blit_annotation(event.canvas)
+                return
+            if annotation.get_visible() and artists.get("point") == i:
+                return
+            current = artists["chart"]  # the chart on display, also after in-place updates
+            artists["point"] = i
+            annotation.xy = (current["x"][i], current["y"].iloc[i])
+            annotation.set_text(self._point_label(current, i))
+            annotation.set_visible(True)
+            blit_annotation(event.canvas)
+
+        if "click" not in artists:  # a figure redrawn after clf() keeps its connections
+            artists["click"] = fig.canvas.mpl_connect("button_press_event", on_point)
+            fig.canvas.mpl_connect("motion_notify_event", on_point)
+            fig.canvas.mpl_connect("draw_event", on_draw)
+
+        def on_xlim_changed(changed_ax):
+            """Zoom and pan (navigation toolbar): decimate again over the visible range only."""
+            current = artists["chart"]
+            if current["max_points"] and len(current["y"]) > current["max_points"]:
+                shown = self._trace_positions(current, changed_ax.get_xlim())
+                artists["data"].set_data(np.asarray(current["x"])[shown], current["y"].values[shown])
+
+        ax.callbacks.connect("xlim_changed", on_xlim_changed)
 
         fig.tight_layout()
 
-        if pdf is not None:
-            pdf.savefig(fig)
-            plt.close(fig)
-            return None
-        else:
-            return fig
+    def _update_x_chart(self, artists, chart):
+        """
+        Show `chart` on the artists of a drawn X-chart by replacing their data.
+        Returns False, and changes nothing, when its layout differs (other limits, run-rule marks or label).
+        """
+        if artists.get("layout") != chart["layout"]:
+            return False
+        x, y_values = np.asarray(chart["x"]), chart["y"]
+
+        def points(positions):
+            return np.column_stack([positions, y_values.loc[positions].to_numpy(dtype=float)])
+
+        shown = self._trace_positions(chart)
+        artists["data"].set_data(x[shown], y_values.values[shown])
+        for name, value in chart["limits"].items():
+            if np.ndim(value) == 0:
+                artists["limits"][name].set_ydata([value, value])
+            else:
+                artists["limits"][name].set_data(x, np.asarray(value, dtype=float))
+        artists["outliers"].set_offsets(points(chart["outliers"]))
+        artists["annotation"].set_visible(False)  # its point may be gone
+        if chart["rules"] is not None:
+            artists["rules"].set_offsets(points(chart["rules"]))
+
+        ax = artists["ax"]
+        ax.set_ylabel(chart["ylabel"])
+        ax.set_title(chart["title"])
+        artists["chart"] = chart  # before the rescale, which calls on_xlim_changed
+        ax.relim()
+        ax.autoscale_view()
+        ax.figure.tight_layout()
+        return True
+
+    @classmethod
+    def run_rule_violations(cls, values, CL, sigma_upper, sigma_lower, rules=None):
+        """
+        Positions in `values` (a series in time order) where a run rule is completed.
+        - σ zones are measured from CL with sigma_upper above it and sigma_lower below it.
+        - Every rule is a count over a sliding window, taken from one cumulative sum: linear in the series length.
+        - A window is reported at its last point; "beyond" zone rules also need that point in the zone.
+        - Returns {rule name: array of positions} for the rules of `rules` (default: all of run_rules).
+        """
+        x = np.asarray(values, dtype=float)
+        rules = cls.run_rules if rules is None else {name: cls.run_rules[name] for name in rules}
+
+        def window_ends(flags, k, m):
+            """Last positions of the windows of k flags holding at least m True values."""
+            if flags.size < k:
+                return np.array([], dtype=int)
+            counts = np.cumsum(np.concatenate(([0], flags)))
+            return np.flatnonzero(counts[k:] - counts[:-k] >= m) + k - 1
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            z = np.where(x >= CL, (x - CL) / sigma_upper, (x - CL) / sigma_lower)  # signed distance in σ
+        above = x > CL
+        below = x < CL
+        step = np.sign(np.diff(x))
+
+        violations = {}
+        for name, (pattern, k, m, zone) in rules.items():
+            if pattern == "zone":
+                ends = [end for side in (z >= zone, z <= -zone) for end in window_ends(side, k, m) if side[end]]
+            elif pattern == "side":
+                ends = np.concatenate([window_ends(above, k, m), window_ends(below, k, m)])
+            elif pattern == "trend":  # k points: k-1 steps the same way
+                ends = np.concatenate([window_ends(step > 0, k - 1, m - 1), window_ends(step < 0, k - 1, m - 1)]) + 1
+            elif pattern == "alternate":  # k points: k-2 turns between consecutive steps
+                ends = window_ends(step[:-1] * step[1:] < 0, k - 2, m - 2) + 2
+            elif pattern == "inner":
+                ends = window_ends(np.abs(z) < zone, k, m)
+            elif pattern == "outer":
+                ends = window_ends(np.abs(z) > zone, k, m)
+            else:
+                raise ValueError(f"Unknown run-rule pattern '{pattern}'.")
+            violations[name] = np.unique(np.asarray(ends, dtype=int))
+        return violations
+
+    def column_run_rules(self, data_rounded, CL, LCL, UCL, Z_alpha, is_gamma, rules=None):
+        """
+        Run-rule violations of one criterion as index labels of `data_rounded`.
+        - The σ zones follow the method: σ is the distance from CL to the statistical control limit
+          (unrounded) divided by z, and it is mirrored on the side bounded by 0 or 100%.
+        """
+        sigma = (UCL - CL) / Z_alpha if is_gamma else (CL - LCL) / Z_alpha
+        positions = self.run_rule_violations(data_rounded.to_numpy(dtype=float), CL, sigma, sigma, rules)
+        return {name: data_rounded.index[found] for name, found in positions.items()}
 
     def define_outliers(self, valid_data, column, LCL, UCL, LSL, USL):
-        valid_data_rounded = valid_data.apply(lambda x: self.round_half_up(x, 2))
-        UCL = self.round_half_up(UCL, 2)
-        LCL = self.round_half_up(LCL, 1)
+        valid_data_rounded = self.round_half_up_array(valid_data, 2)
+        LCL, UCL, LSL, USL = self.round_limits(column, LCL, UCL, LSL, USL)
+
+        out_of_control_mask = (valid_data_rounded > UCL) | (valid_data_rounded < LCL)
+        out_of_control = valid_data_rounded.index[out_of_control_mask]
+        out_of_control_info = self.loc[out_of_control, ['ID']]
+
+        return LCL, UCL, LSL, USL, out_of_control, out_of_control_info, valid_data_rounded
+
+    def round_limits(self, column, LCL, UCL, LSL, USL):
+        """
+        Rounds the limits as they are reported on the charts and moves the one-sided limit
+        (UCL/USL for the mean γ, LCL/LSL for GPRs) out by one rounding step.
+        Works on scalars and, element-wise, on arrays of limits (rolling limits).
+        """
+        round_half_up = self.round_half_up if np.ndim(UCL) == 0 else self.round_half_up_array
+        UCL = round_half_up(UCL, 2)
+        LCL = round_half_up(LCL, 1)
 
         if column == "Global Mean Gamma Index":
             target = UCL + 0.01
-            target = self.round_half_up(target, 2)
+            target = round_half_up(target, 2)
             UCL = target
             target2 = USL + 0.01
-            target2 = self.round_half_up(target2, 2)
+            target2 = round_half_up(target2, 2)
             USL = target2
         else:
             target = LCL - 0.1
-            target = self.round_half_up(target, 1)
+            target = round_half_up(target, 1)
             LCL = target
             target2 = LSL - 0.1
-            target2 = self.round_half_up(target2, 1)
+            target2 = round_half_up(target2, 1)
             LSL = target2
 
-        out_of_control_mask = (valid_data_rounded > UCL) | (valid_data_rounded < LCL)
-        out_of_control = valid_data_rounded.index[out_of_control_mask]
-        out_of_control_info = self.loc[out_of_control, ['ID']]
+        return LCL, UCL, LSL, USL
 
-        return LCL, UCL, LSL, USL, out_of_control, out_of_control_info, valid_data_rounded
+    def criteria_matrix(self, selected_columns):
+        """
+        Returns the selected criteria as one 2-D float array (rows = plans, columns = criteria).
+        Missing values stay as NaN.
+        """
+        return np.asfortranarray(self[list(selected_columns)].to_numpy(dtype=float))
 
-    def get_shewhart_x_chart_figs(self, confidence_level="99.73%", selected_columns=None):
+    @staticmethod
+    def central_moments(packed, n, mean, total=np.nansum, kurtosis=False):
         """
-        Return matplotlib figures for GUI display for selected columns.
+        Second and third (and with `kurtosis`, fourth) central moments of every column of a matrix
+        whose missing values are NaN; the order of the values does not matter.
         """
-        alpha, Z_alpha = self.get_z_info(confidence_level)
-        bita = self.b
-        d2 = 1.128
+        dev = packed - mean
+        dev2 = dev * dev
+        moments = {"m2": total(dev2, axis=0) / n, "m3": total(dev2 * dev, axis=0) / n}
+        if kurtosis:
+            moments["m4"] = total(dev2 * dev2, axis=0) / n
+        return moments
+
+    @staticmethod
+    def skewness(m2, m3, mean):
+        """Skewness m3 / m2^1.5, NaN for (numerically) constant data as in scipy.stats.skew."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            k3 = m3 / m2 ** 1.5
+        k3[m2 <= (np.finfo(float).eps * mean) ** 2] = np.nan
+        return k3
+
+    @staticmethod
+    def pack_columns(X, valid, n):
+        """
+        Moves the valid values of each column to the top, keeping their time order (NaN below them).
+        Returns X itself when nothing is missing.
+        """
+        if valid.all():
+            return X
+        packed = np.full(X.shape, np.nan, order="F")
+        packed.T[np.arange(X.shape[0]) < n[:, None]] = X.T[valid.T]
+        return packed
+
+    @classmethod
+    def criteria_statistics(cls, X, sums=None, sorted_X=None):
+        """
+        Column-wise SPC statistics of a NaN-aware criteria matrix, computed for all columns at once.
+        - NaNs are skipped, so moving ranges are taken between consecutive valid values (as with dropna()).
+        - `sums` (arrays "sum" and "sum_MR" per column, see running_sums) replaces the summation
+          of the values and of the moving ranges.
+        - `sorted_X` (X sorted by column, see sorted_criteria) gives the moments of the skewness,
+          which do not depend on the order of the values.
+        - Returns a dict of 1-D arrays: counts, CL, mean moving range, P_X and skewness (k3).
+        """
+        X = np.asarray(X, dtype=float)
+        if X.ndim == 1:
+            X = X[:, None]
+        X = np.asfortranarray(X)
+        valid = ~np.isnan(X)
+        n = valid.sum(axis=0)
+
+        complete = valid.all()
+        total = np.sum if complete else np.nansum  # same sums; nansum copies the matrix to zero its NaNs
+        if sums is None:
+            packed = cls.pack_columns(X, valid, n)
+        else:
+            packed = X  # only the moments below are summed, and their order does not matter
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if sums is None:
+                CL = total(packed, axis=0) / n
+                MR = np.abs(np.diff(packed, axis=0))
+                mean_MR = total(MR, axis=0) / (n - 1)
+            else:
+                CL = np.asarray(sums["sum"], dtype=float) / n
+                mean_MR = np.asarray(sums["sum_MR"], dtype=float) / (n - 1)
+            P_X = np.sum(X <= CL, axis=0) / n  # Probability that X ≤ X̄
+            moments = cls.central_moments(packed if sorted_X is None else sorted_X, n, CL, total)
+        k3 = cls.skewness(moments["m2"], moments["m3"], CL)
 
-        figures = []
-        results_list = []
+        return {"n": n, "CL": CL, "mean_MR": mean_MR, "P_X": P_X, "k3": k3}
 
-        outlier_dict = {}
-        for column in selected_columns:
-            valid_data = self[column].dropna()
-            USL = None
-            LSL = None
-            MR = np.abs(np.diff(valid_data))
-            mean_MR = np.mean(MR)
-            CL = np.mean(valid_data)
-            sigma = mean_MR / d2
-
-            if column == "Global Mean Gamma Index":
-                # TOLERANCE
+    @classmethod
+    def criteria_limits(cls, stats, method, alpha, Z_alpha, is_gamma, gamma):
+        """
+        Control (LCL/UCL) and action (LSL/USL) limits of one SPC method for every column of `stats`.
+        - `is_gamma` flags the mean γ columns (upper limits) against the GPR columns (lower limits).
+        - Missing action limits are returned as NaN.
+        """
+        CL = stats["CL"]
+        mean_MR = stats["mean_MR"]
+        P_X = stats["P_X"]
+        is_gamma = np.asarray(is_gamma, dtype=bool)
+        T = np.where(is_gamma, np.nan if gamma is None else gamma, 100)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if method == "shewhart":
+                sigma = mean_MR / cls.d2
+                DA = cls.b * np.sqrt(sigma ** 2 + (CL - T) ** 2)
                 UCL = CL + Z_alpha * sigma
-                LCL = 0
-                # ACTIONS
-                T = self.gamma
-                DA = bita * np.sqrt(sigma ** 2 + (CL - T) ** 2)
-                USL = CL + DA / 2
-            else:
-                # TOLERANCE
-                UCL = 100
                 LCL = CL - Z_alpha * sigma
-                # ACTIONS
-                T = 100
-                DA = bita * np.sqrt(sigma ** 2 + (CL - T) ** 2)
+                USL = CL + DA / 2
                 LSL = CL - DA / 2
+            elif method == "wsd":
+                d2_WSD = cls.interp_d2_WSD(P_X)
+                UCL = CL + (Z_alpha * mean_MR / d2_WSD) * 2 * P_X
+                LCL = CL - (Z_alpha * mean_MR / d2_WSD) * 2 * (1 - P_X)
+                USL = CL + np.sqrt(((3 * mean_MR / d2_WSD) * 2 * P_X) ** 2 + (3 * (CL - T)) ** 2)
+                LSL = CL - np.sqrt(((3 * mean_MR / d2_WSD) * 2 * (1 - P_X)) ** 2 + (3 * (CL - T)) ** 2)
+            elif method == "swv":
+                W_U = cls.interp_WU(P_X)
+                W_L = cls.interp_WL(P_X)
+                Z_alpha_U = ndtri(1 - alpha / (4 * (1 - P_X)))  # norm.ppf without the scipy.stats overhead
+                Z_alpha_L = ndtri(1 - alpha / (4 * P_X))
+                width_U = (W_U / 3) * np.sqrt(1 / (2 * (1 - P_X))) * mean_MR
+                width_L = (W_L / 3) * np.sqrt(1 / (2 * P_X)) * mean_MR
+                UCL = CL + width_U * Z_alpha_U
+                LCL = CL - width_L * Z_alpha_L
+                USL = CL + np.sqrt((3 * width_U) ** 2 + (3 * (CL - T)) ** 2)
+                LSL = CL - np.sqrt((3 * width_L) ** 2 + (3 * (CL - T)) ** 2)
+            elif method == "sc":
+                k3 = stats["k3"]
+                d2_sc = cls.interp_d2_sc(np.abs(k3))
+                skew_factor = (1 / 6) * (Z_alpha ** 2 - 1) * k3 / (1 + 0.2 * k3 ** 2)
+                skew_factor_action = (4 / 3) * k3 / (1 + 0.2 * k3 ** 2)
+                UCL = CL + (Z_alpha + skew_factor) * (mean_MR / d2_sc)
+                LCL = CL + (-Z_alpha + skew_factor) * (mean_MR / d2_sc)
+                USL = CL + np.sqrt(((3 + skew_factor_action) * (mean_MR / d2_sc)) ** 2 + (3 * (CL - T)) ** 2)
+                LSL = CL - np.sqrt(((-3 + skew_factor_action) * (mean_MR / d2_sc)) ** 2 + (3 * (CL - T)) ** 2)
+            else:
+                raise ValueError(f"Unknown SPC method '{method}'. Try one of: {list(cls.spc_methods.keys())}")
+
+        return {
+            # TOLERANCE
+            "LCL": np.where(is_gamma, 0.0, LCL),
+            "UCL": np.where(is_gamma, UCL, 100.0),
+            # ACTIONS
+            "LSL": np.where(is_gamma, np.nan, LSL),
+            "USL": np.where(is_gamma, USL, np.nan),
+        }
 
-            LCL, UCL, LSL, USL, out_of_control, out_of_control_info, valid_data_rounded = self.define_outliers(
-                valid_data, column, LCL, UCL, LSL, USL)
-
-            outlier_dict[column] = list(out_of_control_info["ID"].values)
-
-            fig = self.plot_x_chart(
-                pdf=None,
-                column=column,
-                CL=CL,
-                UCL=UCL,
-                LCL=LCL,
-                USL=USL,
-                LSL=LSL,
-                data_to_plot=valid_data_rounded,
-                out_of_control=out_of_control,
-                confidence_level=confidence_level,
-                method_name="Shewhart"
-            )
-
-            figures.append(fig)
-
-            results_list.append({
-                "GPR Column": column,
-                "Mean (X̄)": self.round_half_up(CL, 1),
-                "Counts": valid_data_rounded.count(),
-                "LCL": LCL,
-                "UCL": UCL,
-                "LSL": LSL if LSL is not None else None,
-                "USL": USL if USL is not None else None,
-                "Out-of-Control IDs": list(out_of_control_info["ID"].values)
-            })
-
-        return figures, outlier_dict, results_list
-
-    def get_swv_x_chart_figs(self, confidence_level="99.73%", selected_columns=None):
+    def spc_statistics(self, selected_columns, skewness=False):
         """
-        Return matplotlib figures for GUI display for selected columns.
+        criteria_statistics of the selected columns.
+        Columns with eliminations take their mean and moving ranges from the running sums.
+        With `skewness` (the SC method), the skewness comes from the shared sorted columns (see sorted_criteria).
+        """
+        selected_columns = list(selected_columns)
+        tracked = np.array([column in self.spc_sums for column in selected_columns], dtype=bool)
+
+        def sorted_X(columns):
+            return self.sorted_criteria(columns) if skewness else None
+
+        if not tracked.any():
+            return self.criteria_statistics(self.criteria_matrix(selected_columns), sorted_X=sorted_X(selected_columns))
+
+        stats = {}
+        for mask in (~tracked, tracked):
+            columns = [column for column, keep in zip(selected_columns, mask) if keep]
+            if not columns:
+                continue
+            sums = None
+            if mask is tracked:
+                sums = {key: [self.spc_sums[column][key] for column in columns] for key in ("sum", "sum_MR")}
+            part = self.criteria_statistics(self.criteria_matrix(columns), sums, sorted_X(columns))
+            for key, value in part.items():
+                stats.setdefault(key, np.empty(len(selected_columns), dtype=value.dtype))[mask] = value
+        return stats
+
+    def compute_spc_limits(self, method="shewhart", confidence_level="99.73%", selected_columns=None):
+        """
+        Vectorized SPC limits for all selected columns in a single pass.
+        Returns a DataFrame indexed by column with the counts, CL, mean moving range,
+        P_X, skewness and the (unrounded) LCL/UCL/LSL/USL.
         """
+        if selected_columns is None:
+            selected_columns = self.present_criteria
         alpha, Z_alpha = self.get_z_info(confidence_level)
-        bita = self.b
-        d2 = 1.128
 
-        PX_values = np.array([0.30, 0.32, 0.34, 0.36, 0.38, 0.40, 0.42, 0.44, 0.46, 0.48,
-                              0.50, 0.52, 0.54, 0.56, 0.58, 0.60, 0.62, 0.64, 0.66, 0.68, 0.70])
-        WL_values = np.array([3.26, 2.98, 2.74, 2.53, 2.36, 2.26, 2.14, 2.04, 1.97, 1.93, 1.88,
-                              1.86, 1.83, 1.81, 1.82, 1.84, 1.85, 1.89, 1.96, 2.04, 2.13])
-        WU_values = np.flip(WL_values)
+        stats = self.spc_statistics(selected_columns, skewness=(method == "sc"))
+        is_gamma = [column == "Global Mean Gamma Index" for column in selected_columns]
+        limits = self.criteria_limits(stats, method, alpha, Z_alpha, is_gamma, self.gamma)
 
-        interp_WL = interp1d(PX_values, WL_values, kind='linear',
-                             fill_value="extrapolate")  # "extrapolate": If someone gives me an input outside the range of PX, just extend the line and estimate it.
-        interp_WU = interp1d(PX_values, WU_values, kind='linear', fill_value="extrapolate")
+        return pd.DataFrame({**stats, **limits}, index=pd.Index(selected_columns, name="GPR Column"))
 
-        figures = []
-        results_list = []
+    def confidence_sweep(self, confidence_levels, methods=None, selected_columns=None):
+        """
+        Limits and out-of-control counts over a grid of confidence levels, for every method and column.
+        - The statistics are computed once; criteria_limits is evaluated with alpha and z as
+          (levels x 1) arrays, so the whole grid is broadcast in one pass per method.
+        - Outliers are counted with a binary search in the sorted, rounded values of each column
+          (see sorted_criteria).
+        - Returns a long table: one row per method, column and level, limits rounded as on the charts.
+        """
+        methods = list(self.spc_methods) if methods is None else list(methods)
+        if selected_columns is None:
+            selected_columns = self.present_criteria
+        selected_columns = list(selected_columns)
+
+        levels = list(confidence_levels)
+        z_info = np.array([self.get_z_info(level) for level in levels], dtype=float).reshape(-1, 2)
+        alpha = z_info[:, :1]
+        Z_alpha = z_info[:, 1:]
+        level_fraction = 1 - z_info[:, 0]
+
+        stats = self.spc_statistics(selected_columns, skewness=("sc" in methods))
+        is_gamma = [column == "Global Mean Gamma Index" for column in selected_columns]
+        # half-up rounding keeps the order, so the rounded values of the shared sort are sorted too
+        sorted_values = [self.round_half_up_array(self.sorted_column(column), 2) for column in selected_columns]
+
+        tables = []
+        for method in methods:
+            limits = self.criteria_limits(stats, method, alpha, Z_alpha, is_gamma, self.gamma)
+            limits = {key: np.broadcast_to(value, (len(levels), len(selected_columns)))
+                      for key, value in limits.items()}
+            for j, column in enumerate(selected_columns):
+                LSL = None if is_gamma[j] else limits["LSL"][:, j]
+                USL = limits["USL"][:, j] if is_gamma[j] else None
+                LCL, UCL, LSL, USL = self.round_limits(column, limits["LCL"][:, j], limits["UCL"][:, j], LSL, USL)
+                values = sorted_values[j]
+                with np.errstate(invalid="ignore"):  # a NaN limit flags nothing, as in define_outliers
+                    counts = (np.where(np.isnan(UCL), 0, values.size - np.searchsorted(values, UCL, side="right"))
+                              + np.where(np.isnan(LCL), 0, np.searchsorted(values, LCL, side="left")))
+                tables.append(pd.DataFrame({
+                    "Method": method,
+                    "GPR Column": column,
+                    "Confidence Level": level_fraction,
+                    "alpha": z_info[:, 0],
+                    "Z": z_info[:, 1],
+                    "LCL": LCL,
+                    "UCL": UCL,
+                    "LSL": np.nan if LSL is None else LSL,
+                    "USL": np.nan if USL is None else USL,
+                    "Out-of-Control Count": counts,
+                }))
+        return pd.concat(tables, ignore_index=True)
+
+    def compute_spc(self, method="shewhart", confidence_level="99.73%", selected_columns=None, n_boot=0):
+        """
+        Headless SPC run: limits, out-of-control points and rounded series for every selected column.
+        - Returns a list of SPCResult objects; no matplotlib figure is created.
+        - A result's figure is only built when its `figure` attribute is first accessed.
+        - With `n_boot` > 0 every result also carries the 95% bootstrap intervals of its limits.
+        - Results are memoized per criterion (see RESULT CACHE): a repeated run only computes the
+          criteria whose values changed since.
+        """
+        if selected_columns is None:
+            selected_columns = self.present_criteria
+        if method in self.multivariate_methods:
+            key = self._result_key(method, confidence_level, tuple(selected_columns))
+            if key in self.result_cache:
+                self.result_cache.move_to_end(key)
+            else:
+                self._cache_result(key, self.compute_hotelling_spc(confidence_level, selected_columns))
+            return [self.result_cache[key]]
+        keys = {column: self._result_key(method, confidence_level, column, n_boot) for column in selected_columns}
+        cached = {}
+        for column, key in keys.items():
+            if key in self.result_cache:
+                self.result_cache.move_to_end(key)
+                cached[column] = self.result_cache[key]
+        missing = [column for column in keys if column not in cached]
+        if missing:
+            for result in self._compute_spc_results(method, confidence_level, missing, n_boot):
+                cached[result.column] = result
+                self._cache_result(keys[result.column], result)
+
+        return [cached[column] for column in keys]
+
+    def _compute_spc_results(self, method, confidence_level, selected_columns, n_boot):
+        if method in self.time_weighted_methods:
+            return self.compute_time_weighted_spc(method, confidence_level, selected_columns)
+        limits_df = self.compute_spc_limits(method, confidence_level, selected_columns)
+        Z_alpha = self.get_z_info(confidence_level)[1]
+        intervals = None
+        if n_boot > 0:
+            intervals = self.bootstrap_limits([method], confidence_level, list(limits_df.index), n_boot).loc[method]
 
-        outlier_dict = {}
-        for column in selected_columns:
+        results = []
+        for column, row in limits_df.iterrows():
             valid_data = self[column].dropna()
-            USL = None
-            LSL = None
-            MR = np.abs(np.diff(valid_data))
-            mean_MR = np.mean(MR)
-            CL = np.mean(valid_data)
-
-            P_X = np.mean(valid_data <= CL)
-            W_L = interp_WL(P_X)
-            W_U = interp_WU(P_X)
-
-            Z_alpha_U = norm.ppf(1 - alpha / (4 * (1 - P_X)))
-            Z_alpha_L = norm.ppf(1 - alpha / (4 * P_X))
-
-            if column == "Global Mean Gamma Index":
-                # TOLERANCE
-                UCL = CL + (W_U / 3) * np.sqrt(1 / (2 * (1 - P_X))) * Z_alpha_U * mean_MR
-                LCL = 0
-                # ACTION
-                T = self.gamma
-                DA_2 = np.sqrt((3 * (W_U / 3) * np.sqrt(1 / (2 * (1 - P_X))) * mean_MR) ** 2 + (3 * (CL - T)) ** 2)
-                USL = CL + DA_2
-            else:
-                # TOLERANCE
-                UCL = 100
-                LCL = CL - (W_L / 3) * np.sqrt(1 / (2 * P_X)) * Z_alpha_L * mean_MR
-                # ACTION
-                T = 100
-                DA_2 = np.sqrt((3 * (W_L / 3) * np.sqrt(1 / (2 * P_X)) * mean_MR) ** 2 + (3 * (CL - T)) ** 2)
-                LSL = CL - DA_2
+            # Only one action limit exists per criterion; NaN on the other side means too few values
+            is_gamma = column == "Global Mean Gamma Index"
+            LSL = None if is_gamma else row["LSL"]
+            USL = row["USL"] if is_gamma else None
 
             LCL, UCL, LSL, USL, out_of_control, out_of_control_info, valid_data_rounded = self.define_outliers(
-                valid_data, column, LCL, UCL, LSL, USL)
-            outlier_dict[column] = list(out_of_control_info["ID"].values)
+                valid_data, column, row["LCL"], row["UCL"], LSL, USL)
 
-            fig = self.plot_x_chart(
-                pdf=None,
+            results.append(SPCResult(
+                df=self,
+                method=method,
                 column=column,
-                CL=CL,
-                UCL=UCL,
+                confidence_level=confidence_level,
+                CL=row["CL"],
                 LCL=LCL,
-                USL=USL,
+                UCL=UCL,
                 LSL=LSL,
-                data_to_plot=valid_data_rounded,
+                USL=USL,
                 out_of_control=out_of_control,
-                confidence_level=confidence_level,
-                method_name="SWV"
-            )
-
-            figures.append(fig)
-
-            results_list.append({
-                "GPR Column": column,
-                "Mean (X̄)": self.round_half_up(CL, 1),
-                "Counts": valid_data_rounded.count(),
-                "LCL": LCL,
-                "UCL": UCL,
-                "LSL": LSL if LSL is not None else None,
-                "USL": USL if USL is not None else None,
-                "Out-of-Control IDs": list(out_of_control_info["ID"].values)
-            })
-
-        return figures, outlier_dict, results_list
+                out_of_control_ids=list(out_of_control_info["ID"].values),
+                data_rounded=valid_data_rounded,
+                intervals=None if intervals is None else intervals.loc[column].to_dict(),
+                rule_violations=self.column_run_rules(valid_data_rounded, row["CL"], row["LCL"], row["UCL"],
+                                                      Z_alpha, is_gamma)
+            ))
+
+        return results
+
+    # ===================== SORTED CRITERIA ===================== #
+    # One ascending sort per criterion and data version, shared by the normality tests, the
+    # histogram titles, the SC skewness and confidence_sweep. Eliminations advance the data
+    # version (see RESULT CACHE), which sorts the criterion again on its next use.
+
+    def sorted_column(self, column):
+        """Valid values of `column` in ascending order."""
+        version = self.data_versions.get(column, 0)
+        entry = self.sorted_cache.get(column)
+        if entry is None or entry[0] != version:
+            values = self[column].to_numpy(dtype=float)
+            entry = (version, np.sort(values[~np.isnan(values)]))
+            self.sorted_cache[column] = entry
+        return entry[1]
+
+    def sorted_criteria(self, selected_columns):
+        """The selected criteria sorted by column, NaN below the values: np.sort(criteria_matrix, axis=0)."""
+        columns = list(selected_columns)
+        S = np.full((len(self), len(columns)), np.nan, order="F")
+        for j, column in enumerate(columns):
+            values = self.sorted_column(column)
+            S[:values.size, j] = values
+        return S
+
+    # ===================== RESULT CACHE ===================== #
+    # compute_spc keeps its SPCResults, and so the figures built from them, keyed by method,
+    # confidence level, criterion and the criterion's data version. Eliminations advance the
+    # version of the criteria they change; the least recently used results are evicted first.
+    # A multivariate result is keyed by the tuple of its criteria and their versions.
+
+    def _result_key(self, method, confidence_level, column, n_boot=0):
+        if isinstance(column, tuple):
+            version = tuple(self.data_versions.get(crit, 0) for crit in column)
+        else:
+            version = self.data_versions.get(column, 0)
+        return method, self.get_z_info(confidence_level), column, version, n_boot
+
+    def _cache_result(self, key, result):
+        self.result_cache[key] = result
+        while len(self.result_cache) > self.result_cache_size:
+            _, evicted = self.result_cache.popitem(last=False)
+            evicted.release_figure()
+
+    def bump_data_version(self, columns):
+        """Advance the data version of `columns` and drop their cached results."""
+        columns = set(columns)
+        for column in columns:
+            self.data_versions[column] = self.data_versions.get(column, 0) + 1
+        for key in [key for key in self.result_cache
+                    if (columns.intersection(key[2]) if isinstance(key[2], tuple) else key[2] in columns)]:
+            self.result_cache.pop(key).release_figure()
+
+    def clear_result_cache(self):
+        for result in self.result_cache.values():
+            result.release_figure()
+        self.result_cache.clear()
+
+    def release_result(self, result):
+        """Let go of the figure of a result that left the screen, unless the cache keeps it for a repeat view."""
+        if not any(cached is result for cached in self.result_cache.values()):
+            result.release_figure()
+
+    # ===================== FIGURE POOL ===================== #
+    # The GUI keeps one figure per (method, criterion), and per criterion for the histograms.
+    # A rerun (e.g. after an elimination round) draws into the figure already there: an I-chart
+    # of the same layout only gets new data on its line, scatter and limit artists, anything else
+    # is redrawn on the cleared figure. Memory stays flat however many rounds are run; a
+    # figure is only closed by close_figures.
+
+    def pooled_x_chart(self, key, owner, **chart_kwargs):
+        """
+        The pooled figure of `key` showing the X-chart of `chart_kwargs` (arguments of plot_x_chart).
+        - `owner` (an SPCResult) holds the figure until another owner takes it, see owned_figure.
+        """
+        chart = self._x_chart_data(**chart_kwargs)
+        entry = self.figure_pool.get(key)
+        if entry is None or "artists" not in entry:
+            fig, ax = self._pooled_axes(key)
+            entry = self.figure_pool[key]
+            entry["artists"] = {}
+            self._draw_x_chart(ax, chart, entry["artists"])
+        elif not self._update_x_chart(entry["artists"], chart):
+            fig, ax = self._pooled_axes(key)
+            self._draw_x_chart(ax, chart, entry["artists"])
+        entry["owner"] = owner
+        return entry["figure"]
+
+    def _pooled_axes(self, key):
+        """(figure, axes) of `key`: a new figure, or the pooled one cleared for a full redraw."""
+        sns.set_style("darkgrid")  # the style is taken when the axes are created
+        entry = self.figure_pool.get(key)
+        if entry is None:
+            fig, ax = plt.subplots(figsize=(8, 4))
+            self.figure_pool[key] = {"figure": fig, "owner": None}
+            return fig, ax
+        fig = entry["figure"]
+        fig.clf()
+        return fig, fig.add_subplot()
+
+    def owned_figure(self, key, owner):
+        """The pooled figure of `key` if `owner` still holds it, else None."""
+        entry = self.figure_pool.get(key)
+        return entry["figure"] if entry is not None and entry["owner"] is owner else None
+
+    def release_figure(self, key, owner):
+        """`owner` lets go of the pooled figure of `key`; the figure stays for the next chart of the key."""
+        entry = self.figure_pool.get(key)
+        if entry is not None and entry["owner"] is owner:
+            entry["owner"] = None
+
+    def close_figures(self, keys=None):
+        """Close the pooled figures of `keys` (default: all of them)."""
+        for key in list(self.figure_pool) if keys is None else keys:
+            entry = self.figure_pool.pop(key, None)
+            if entry is not None:
+                plt.close(entry["figure"])
+
+    # ===================== PDF REPORTS ===================== #
+    # A report is a sequence of pages, each one (kind, drawing arguments, savefig arguments) of plain
+    # data (limits and series, never figures). export_pdf renders the pages in worker processes and
+    # merges the single-page PDFs in order.
+
+    report_pool_min_pages = 4  # export_pdf: pages from which worker processes pay off
+
+    def spc_report_pages(self, results, site=None):
+        """Report pages of SPCResults (their I-charts); with `site`, the titles name the site of cancer."""
+        for result in results:
+            arguments = result.chart_arguments()
+            if site is not None:
+                title = arguments.get("title") or self.x_chart_title(result.column, result.method_name,
+                                                                     arguments.get("chart_name"))
+                arguments["title"] = f"{site} | {title}"
+            yield "x_chart", arguments, {"bbox_inches": "tight"}
+
+    def histogram_report_pages(self, selected_columns=None):
+        """Report pages of the histograms of the selected columns, as saved by plot_histograms_gui."""
+        numeric_data = self[self.columns.intersection(self.data_for_analysis)].select_dtypes(include=['number'])
+        if selected_columns is not None:
+            numeric_data = numeric_data[selected_columns]
+        shape = self.normality_table(None, numeric_data.columns, self.sorted_criteria(numeric_data.columns))
+        for feature in numeric_data.columns:
+            yield "histogram", {"values": numeric_data[feature], "shape": shape.loc[feature]}, \
+                {"dpi": 300, "bbox_inches": "tight"}
 
-    def get_wsd_x_chart_figs(self, confidence_level="99.73%", selected_columns=None):
+    def department_report_pages(self, methods=None, confidence_level="99.73%", selected_columns=None,
+                                histograms=True):
         """
-        Return matplotlib figures for GUI display for selected columns.
+        Report pages of every site of cancer x method x criterion, then the histograms of the criteria.
+        - Every site is analysed as a file of that site alone (its own γ), like compute_spc_by_site.
+        - Pages are generated site by site, so only one site's results are held at a time.
+        """
+        methods = list(self.spc_methods) if methods is None else list(methods)
+        if selected_columns is None:
+            selected_columns = self.present_criteria
+        selected_columns = list(selected_columns)
+
+        sites, order, bounds = self.site_blocks()
+        for site, start, stop in zip(sites, bounds[:-1], bounds[1:]):
+            site_df = type(self)(data=pd.DataFrame(self.iloc[order[start:stop]]).reset_index(drop=True),
+                                 presorted=True)
+            for method in methods:
+                yield from self.spc_report_pages(site_df.compute_spc(method, confidence_level, selected_columns),
+                                                 site=site)
+        if histograms:
+            yield from self.histogram_report_pages(selected_columns)
+
+    def export_pdf(self, path, pages, max_workers=None):
+        """
+        Write report pages (see PDF REPORTS) to one PDF file, in order.
+        - Worker processes (Agg backend) render every page to a single-page PDF from its plain data;
+          the pages are merged with pypdf as they come back, at most two per worker in flight.
+        - Small reports (below report_pool_min_pages, when the pages are a list), max_workers=1 or a
+          missing pypdf render the pages in this process through PdfPages instead.
+        """
+        try:
+            from pypdf import PdfReader, PdfWriter
+        except ImportError:
+            PdfWriter = None
+        if max_workers is None:
+            small = hasattr(pages, "__len__") and len(pages) < self.report_pool_min_pages
+            max_workers = 1 if small else os.cpu_count() or 1
+
+        if PdfWriter is None or max_workers <= 1:
+            with PdfPages(path) as pdf:
+                for kind, arguments, savefig_kwargs in pages:
+                    fig = _report_page_figure(kind, arguments)
+                    pdf.savefig(fig, **savefig_kwargs)
+                    plt.close(fig)
+            return
+
+        writer = PdfWriter()
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_report_worker) as pool:
+            pending = deque()
+            for page in pages:
+                pending.append(pool.submit(_render_report_page, page))
+                if len(pending) >= 2 * max_workers:
+                    writer.add_page(PdfReader(io.BytesIO(pending.popleft().result())).pages[0])
+            while pending:
+                writer.add_page(PdfReader(io.BytesIO(pending.popleft().result())).pages[0])
+        with open(path, "wb") as f:
+            writer.write(f)
+
+    def rolling_windows(self, column, window=None, days=None):
+        """
+        Start of the rolling window of every valid value of `column` (positions in its valid series).
+        - `window`: the last `window` observations; `days`: the observations of the last `days` days.
+        - Values without a QA Date get no window (start -1) in the `days` mode.
+        """
+        valid = self[column].dropna()
+        m = len(valid)
+        if (window is None) == (days is None):
+            raise ValueError("Give either a window length (observations) or a number of days.")
+        if window is not None:
+            return np.maximum(np.arange(m) - int(window) + 1, 0)
+
+        dates = self.loc[valid.index, "QA Date"].to_numpy(dtype="datetime64[ns]")
+        dated = ~np.isnat(dates)
+        starts = np.full(m, -1)
+        dated_pos = np.flatnonzero(dated)  # NaT dates are at the bottom, so dated values are a prefix
+        starts[dated_pos] = np.searchsorted(dates[dated_pos], dates[dated_pos] - np.timedelta64(int(days), "D"),
+                                            side="right")
+        return starts
+
+    def compute_rolling_limits(self, column, method="shewhart", confidence_level="99.73%", window=None, days=None):
+        """
+        Rolling-window SPC limits: at every observation the limits come from the last `window`
+        observations or the last `days` days, up to and including it.
+        - Every window is one column of a NaN-padded matrix, so criteria_statistics and criteria_limits
+          evaluate all windows at once (in blocks, to bound memory).
+        - Returns a DataFrame on the index of the column's valid values: window size, CL and the
+          rounded LCL/UCL/LSL/USL (NaN while a window has fewer than two values).
         """
         alpha, Z_alpha = self.get_z_info(confidence_level)
-        bita = self.b
-        d2 = 1.128
-
-        PX_values = np.array([0.30, 0.32, 0.34, 0.36, 0.38, 0.40, 0.42, 0.44, 0.46, 0.48,
-                              0.50, 0.52, 0.54, 0.56, 0.58, 0.60, 0.62, 0.64, 0.66, 0.68, 0.70])
-
-        d2_WSD_values = np.array([0.947, 0.982, 1.012, 1.039, 1.063, 1.083, 1.099, 1.112, 1.121,
-                                  1.126, 1.128, 1.126, 1.121, 1.112, 1.099, 1.083, 1.063,
-                                  1.039, 1.012, 0.982, 0.947])
-
-        interp_d2_WSD = interp1d(PX_values, d2_WSD_values, kind='linear', fill_value="extrapolate")
-
-        figures = []
-        results_list = []
-
-        outlier_dict = {}
-        for column in selected_columns:
-            valid_data = self[column].dropna()
-            USL = None
-            LSL = None
-            MR = np.abs(np.diff(valid_data))
-            mean_MR = np.mean(MR)
-            CL = np.mean(valid_data)
-
-            P_X = np.mean(valid_data <= CL)  # Probability that X ≤ X̄
-            d2_WSD = interp_d2_WSD(P_X)  # Interpolate d2_WSD for given P_X
-
-            if column == "Global Mean Gamma Index":
-                # TOLERANCE
-                UCL = CL + (Z_alpha * mean_MR / d2_WSD) * 2 * P_X
-                LCL = 0
-                # ACTION
-                T = self.gamma
-                DA_2 = np.sqrt(((3 * mean_MR / d2_WSD) * 2 * P_X) ** 2 + (3 * (CL - T)) ** 2)
-                USL = CL + DA_2
+        valid = self[column].dropna()
+        values = valid.to_numpy(dtype=float)
+        m = values.size
+        starts = self.rolling_windows(column, window, days)
+        ends = np.arange(m)
+        sizes = np.where(starts >= 0, ends - starts + 1, 0)
+        L = max(int(sizes.max(initial=0)), 1)
+
+        # Row i of `windows` holds values i-L+1 .. i; positions before the window start become NaN
+        padded = np.concatenate([np.full(L - 1, np.nan), values])
+        windows = np.lib.stride_tricks.sliding_window_view(padded, L)
+        offset = np.arange(L)
+
+        is_gamma = column == "Global Mean Gamma Index"
+        keys = ("CL", "LCL", "UCL", "LSL", "USL")
+        out = {key: np.full(m, np.nan) for key in keys}
+        block = max(1, 2_000_000 // L)
+        for first in range(0, m, block):
+            rows = slice(first, min(first + block, m))
+            W = windows[rows].copy()
+            W[offset[None, :] < (L - sizes[rows])[:, None]] = np.nan
+            stats = self.criteria_statistics(W.T)
+            limits = self.criteria_limits(stats, method, alpha, Z_alpha, [is_gamma], self.gamma)
+            out["CL"][rows] = stats["CL"]
+            for key in keys[1:]:
+                out[key][rows] = limits[key]
+
+        LSL = None if is_gamma else out["LSL"]
+        USL = out["USL"] if is_gamma else None
+        LCL, UCL, LSL, USL = self.round_limits(column, out["LCL"], out["UCL"], LSL, USL)
+        return pd.DataFrame({"n": sizes, "CL": out["CL"], "LCL": LCL, "UCL": UCL,
+                             "LSL": np.nan if LSL is None else LSL, "USL": np.nan if USL is None else USL},
+                            index=valid.index)
+
+    def compute_rolling_spc(self, column, method="shewhart", confidence_level="99.73%", window=None, days=None):
+        """
+        Rolling-window SPC run of one column: each point is judged against the limits of its own window.
+        Returns an SPCResult whose CL and limits are arrays (time-varying curves on the chart).
+        """
+        limits = self.compute_rolling_limits(column, method, confidence_level, window, days)
+        is_gamma = column == "Global Mean Gamma Index"
+        valid_data_rounded = self.round_half_up_array(self[column].dropna(), 2)
+        LCL = limits["LCL"].to_numpy()
+        UCL = limits["UCL"].to_numpy()
+
+        out_of_control = valid_data_rounded.index[(valid_data_rounded.to_numpy() > UCL) |
+                                                   (valid_data_rounded.to_numpy() < LCL)]
+        return SPCResult(
+            df=self,
+            method=method,
+            column=column,
+            confidence_level=confidence_level,
+            CL=limits["CL"].to_numpy(),
+            LCL=LCL,
+            UCL=UCL,
+            LSL=None if is_gamma else limits["LSL"].to_numpy(),
+            USL=limits["USL"].to_numpy() if is_gamma else None,
+            out_of_control=out_of_control,
+            out_of_control_ids=list(self.loc[out_of_control, "ID"].values),
+            data_rounded=valid_data_rounded
+        )
+
+    @classmethod
+    def time_weighted_statistics(cls, X, method, Z_alpha, is_gamma):
+        """
+        EWMA or one-sided tabular CUSUM of every column of a criteria matrix (rows in time order), all at once.
+        - EWMA: z_t = λ x_t + (1 - λ) z_t-1 from z_0 = X̄, a first-order linear filter (scipy.signal.lfilter)
+          along the time axis; limits X̄ ± z σ √(λ / (2 - λ) · (1 - (1 - λ)^2t)).
+        - CUSUM: C_t = max(0, C_t-1 + d_t) equals the cumulative sum of d minus its running minimum
+          (taken with 0), so no loop is needed either. GPRs use the lower CUSUM (drops), the mean γ the
+          upper one; the decision interval is h σ.
+        - X̄ and σ = MR̄ / d2 come from criteria_statistics.
+        - The statistic matrix holds each column's valid values on top, as in pack_columns.
+        """
+        X = np.asarray(X, dtype=float)
+        if X.ndim == 1:
+            X = X[:, None]
+        X = np.asfortranarray(X)
+        valid = ~np.isnan(X)
+        n = valid.sum(axis=0)
+        packed = cls.pack_columns(X, valid, n)
+        stats = cls.criteria_statistics(X)
+        mean = stats["CL"]
+        sigma = stats["mean_MR"] / cls.d2
+        is_gamma = np.asarray(is_gamma, dtype=bool)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if method == "ewma":
+                lam = cls.ewma_lambda
+                statistic, _ = lfilter([lam], [1, lam - 1], packed, axis=0, zi=((1 - lam) * mean)[None, :])
+                t = np.arange(1, X.shape[0] + 1)[:, None]
+                width = Z_alpha * sigma * np.sqrt(lam / (2 - lam) * (1 - (1 - lam) ** (2 * t)))
+                CL, LCL, UCL = mean, mean - width, mean + width
+            elif method == "cusum":
+                slack = cls.cusum_k * sigma
+                drift = np.where(is_gamma, packed - mean - slack, mean - slack - packed)
+                S = np.cumsum(drift, axis=0)
+                statistic = S - np.minimum(np.minimum.accumulate(S, axis=0), 0)
+                CL, LCL, UCL = np.zeros_like(mean), np.zeros_like(mean), cls.cusum_h * sigma
             else:
-                # TOLERANCE
-                UCL = 100
-                LCL = CL - (Z_alpha * mean_MR / d2_WSD) * 2 * (1 - P_X)
-                # ACTION
-                T = 100
-                DA_2 = np.sqrt(((3 * mean_MR / d2_WSD) * 2 * (1 - P_X)) ** 2 + (3 * (CL - T)) ** 2)
-                LSL = CL - DA_2
+                raise ValueError(f"Unknown time-weighted method '{method}'. "
+                                 f"Try one of: {list(cls.time_weighted_methods.keys())}")
 
-            LCL, UCL, LSL, USL, out_of_control, out_of_control_info, valid_data_rounded = self.define_outliers(
-                valid_data, column, LCL, UCL, LSL, USL)
+        return {"statistic": statistic, "n": n, "mean": mean, "CL": CL, "LCL": LCL, "UCL": UCL}
 
-            outlier_dict[column] = list(out_of_control_info["ID"].values)
+    def compute_time_weighted_spc(self, method="ewma", confidence_level="99.73%", selected_columns=None):
+        """
+        EWMA or CUSUM charts of the selected columns as SPCResults (compute_spc dispatches here).
+        - As on the I-charts one side is monitored, GPR drops and mean γ increases; the EWMA limit on
+          the other side is the structural 100% / 0.
+        - The chart plots the statistic, rounded to 2 decimals; the plans where it is out of control
+          can be eliminated as usual. The EWMA limits widen with z of the confidence level.
+        """
+        if selected_columns is None:
+            selected_columns = self.present_criteria
+        selected_columns = list(selected_columns)
+        Z_alpha = self.get_z_info(confidence_level)[1]
+        is_gamma = [column == "Global Mean Gamma Index" for column in selected_columns]
+        out = self.time_weighted_statistics(self.criteria_matrix(selected_columns), method, Z_alpha, is_gamma)
 
-            fig = self.plot_x_chart(
-                pdf=None,
+        results = []
+        for j, column in enumerate(selected_columns):
+            valid = self[column].dropna()
+            m = len(valid)
+            statistic = self.round_half_up_array(pd.Series(out["statistic"][:m, j], index=valid.index, name=column), 2)
+            quantity = "Mean γ" if is_gamma[j] else "GPR (%)"
+            if method == "ewma":
+                no_action = np.full(m, np.nan)
+                LCL, UCL, _, _ = self.round_limits(column, out["LCL"][:m, j], out["UCL"][:m, j], no_action, no_action)
+                if is_gamma[j]:
+                    LCL = 0.0
+                else:
+                    UCL = 100.0
+                CL = out["CL"][j]
+                ylabel = f"EWMA of {quantity}"
+            else:
+                CL, LCL, UCL = 0.0, 0.0, self.round_half_up(out["UCL"][j], 2)
+                ylabel = f"{'Upper' if is_gamma[j] else 'Lower'} CUSUM of {quantity}"
+
+            with np.errstate(invalid="ignore"):
+                flagged = (statistic.to_numpy() > UCL) | (statistic.to_numpy() < LCL)
+            out_of_control = statistic.index[flagged]
+            results.append(SPCResult(
+                df=self,
+                method=method,
                 column=column,
+                confidence_level=confidence_level,
                 CL=CL,
-                UCL=UCL,
                 LCL=LCL,
-                USL=USL,
-                LSL=LSL,
-                data_to_plot=valid_data_rounded,
+                UCL=UCL,
+                LSL=None,
+                USL=None,
                 out_of_control=out_of_control,
-                confidence_level=confidence_level,
-                method_name="WSD"
-            )
+                out_of_control_ids=list(self.loc[out_of_control, "ID"].values),
+                data_rounded=statistic,
+                mean=out["mean"][j],
+                chart={"chart_name": f"{self.time_weighted_methods[method]} Chart", "ylabel": ylabel,
+                       "data_label": self.time_weighted_methods[method]}
+            ))
+        return results
+
+    # ===================== MULTIVARIATE ===================== #
+    # The criteria of a plan are strongly correlated, so one Hotelling T² chart of the whole
+    # criteria vector replaces the per-criterion charts and their multiplied false alarms.
+
+    @staticmethod
+    def pairwise_covariance(X):
+        """
+        Mean vector and covariance matrix of a criteria matrix whose missing values are NaN.
+        - Every entry uses the rows where both criteria are present (pairwise deletion), deviations
+          taken from the column means; all entries come from two matrix products.
+        - Pairwise estimates need not be positive semi-definite: negative eigenvalues are set to 0.
+        """
+        valid = ~np.isnan(X)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.nanmean(X, axis=0)
+            dev = np.where(valid, X - mean, 0.0)
+            counts = valid.T.astype(float) @ valid
+            cov = (dev.T @ dev) / (counts - 1)
+        cov[~np.isfinite(cov)] = 0.0
+        w, V = np.linalg.eigh(cov)
+        return mean, (V * np.clip(w, 0, None)) @ V.T
+
+    @classmethod
+    def hotelling_statistics(cls, X, alpha, rcond=1e-10):
+        """
+        Hotelling T² of every row of a criteria matrix (rows = plans) with its contributions.
+        - T² = (x - x̄)' S⁻¹ (x - x̄) with x̄ and S from pairwise_covariance.
+        - A row with missing criteria is scored on the criteria it has, with the matching block of S;
+          rows are grouped by their pattern of missing values, so there is one inverse per pattern.
+        - Collinear criteria are handled with the pseudo-inverse; p is the rank of the block.
+        - Contributions d_j (S⁻¹ d)_j of the criteria add up to T² (NaN for missing criteria).
+        - UCL: Phase I limit for individual observations, (m - 1)² / m · Beta(1 - α; p/2, (m - p - 1)/2),
+          with m the rows having any value. CL is the expected T², p (m - 1) / m.
+        """
+        X = np.asarray(X, dtype=float)
+        mean, cov = cls.pairwise_covariance(X)
+        valid = ~np.isnan(X)
+        dev = np.where(valid, X - np.where(np.isnan(mean), 0.0, mean), 0.0)
+        m = int(valid.any(axis=1).sum())
+
+        T2 = np.full(len(X), np.nan)
+        p = np.zeros(len(X), dtype=int)
+        contributions = np.full(X.shape, np.nan)
+        patterns, group = np.unique(valid, axis=0, return_inverse=True)
+        for g, pattern in enumerate(patterns):
+            if not pattern.any():
+                continue
+            rows = np.flatnonzero(group.ravel() == g)
+            block = cov[np.ix_(pattern, pattern)]
+            d = dev[np.ix_(rows, np.flatnonzero(pattern))]
+            weighted = d @ np.linalg.pinv(block, rcond=rcond, hermitian=True)
+            contributions[np.ix_(rows, np.flatnonzero(pattern))] = d * weighted
+            T2[rows] = (d * weighted).sum(axis=1)
+            p[rows] = np.linalg.matrix_rank(block, tol=rcond * max(np.abs(block).max(), 1e-300), hermitian=True)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            usable = (p > 0) & (m - p - 1 > 0)
+            UCL = np.where(usable, (m - 1) ** 2 / m * beta.ppf(1 - alpha, p / 2, np.maximum(m - p - 1, 1) / 2),
+                           np.nan)
+            CL = np.where(p > 0, p * (m - 1) / max(m, 1), np.nan)
+        return {"T2": T2, "CL": CL, "UCL": UCL, "p": p, "contributions": contributions, "m": m}
+
+    def compute_hotelling_spc(self, confidence_level="99.73%", selected_columns=None):
+        """
+        Hotelling T² chart of the selected criteria as one SPCResult (compute_spc(method="hotelling")
+        returns it memoized).
+        - Plans above the UCL are out of control; eliminating one removes it from every criterion.
+        - `contributions` of the result holds, for every flagged plan, each criterion's share of its T² (%);
+          a share is negative when the criterion's deviation runs against the correlation structure.
+        """
+        if selected_columns is None:
+            selected_columns = self.present_criteria
+        selected_columns = list(selected_columns)
+        alpha = self.get_z_info(confidence_level)[0]
+        stats = self.hotelling_statistics(self.criteria_matrix(selected_columns), alpha)
+
+        scored = np.flatnonzero(~np.isnan(stats["T2"]))
+        index = self.index[scored]
+        name = self.multivariate_methods["hotelling"]
+        T2 = self.round_half_up_array(pd.Series(stats["T2"][scored], index=index, name=name), 2)
+
+        def one_or_all(values):
+            values = self.round_half_up_array(pd.Series(values[scored]), 2).to_numpy()
+            return values[0] if len(values) and (values == values[0]).all() else values
+
+        UCL = one_or_all(stats["UCL"])
+        CL = one_or_all(stats["CL"])
+        with np.errstate(invalid="ignore"):
+            flagged = T2.to_numpy() > UCL
+        out_of_control = index[flagged]
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            shares = stats["contributions"][scored[flagged]] / stats["T2"][scored[flagged], None] * 100
+        contributions = pd.DataFrame(self.round_half_up_array(pd.DataFrame(shares), 1).to_numpy(),
+                                     index=out_of_control, columns=selected_columns)
+
+        return SPCResult(
+            df=self,
+            method="hotelling",
+            column=name,
+            confidence_level=confidence_level,
+            CL=CL,
+            LCL=0.0,
+            UCL=UCL,
+            LSL=None,
+            USL=None,
+            out_of_control=out_of_control,
+            out_of_control_ids=list(self.loc[out_of_control, "ID"].values),
+            data_rounded=T2,
+            chart={"title": f"Hotelling T² Chart of {len(selected_columns)} Criteria", "ylabel": "T²",
+                   "data_label": "T²"},
+            contributions=contributions
+        )
+
+    site_pool_min_rows = 1_000_000  # compute_spc_by_site: rows from which worker processes pay off
+
+    def site_blocks(self):
+        """
+        The rows grouped by site of cancer, keeping the time order inside each site.
+        Returns the sites, the row order and the bounds: site i is order[bounds[i]:bounds[i + 1]].
+        """
+        codes, sites = pd.factorize(self["Site of cancer"], sort=True)
+        keep = np.flatnonzero(codes >= 0)
+        order = keep[np.argsort(codes[keep], kind="stable")]
+        bounds = np.searchsorted(codes[order], np.arange(len(sites) + 1))
+        return sites, order, bounds
+
+    def _map_sites(self, rows_function, X, tasks, max_workers=None):
+        """rows_function(X[start:stop], *args) for every (start, stop, *args) task, see compute_spc_by_site."""
+        if max_workers is None:
+            max_workers = min(len(tasks), os.cpu_count() or 1) if len(X) >= self.site_pool_min_rows else 1
+        if max_workers <= 1 or len(tasks) <= 1:
+            return [rows_function(X[start:stop], *args) for start, stop, *args in tasks]
+
+        shm = shared_memory.SharedMemory(create=True, size=max(X.nbytes, 1))
+        try:
+            np.ndarray(X.shape, dtype=X.dtype, buffer=shm.buf)[:] = X
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                futures = [pool.submit(_site_worker, rows_function, shm.name, X.shape, *task) for task in tasks]
+                return [future.result() for future in futures]
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def compute_spc_by_site(self, methods=None, confidence_level="99.73%", selected_columns=None,
+                            max_workers=None):
+        """
+        Stratified SPC: every site of cancer is analysed on its own, one site per worker process.
+        - The criteria matrix is put once in shared memory, grouped by site; a worker only receives
+          the block name and its row range, so no array is pickled.
+        - γ of the mean γ index is computed per site from its MedianDoseDev, as for a file of that site alone.
+        - By default small data (below site_pool_min_rows) runs in this process: starting the
+          workers would take longer than the analysis. max_workers=1 always runs serially.
+        - Returns one table with a row per site, method and criterion (the SPC summary columns).
+        """
+        methods = list(self.spc_methods) if methods is None else list(methods)
+        for method in methods:
+            if method not in self.spc_methods:
+                raise ValueError(f"Unknown SPC method '{method}'. Try one of: {list(self.spc_methods.keys())}")
+        if selected_columns is None:
+            selected_columns = self.present_criteria
+        selected_columns = list(selected_columns)
+        self.get_z_info(confidence_level)  # fail here rather than in every worker
+
+        sites, order, bounds = self.site_blocks()
+        X = self[selected_columns].to_numpy(dtype=float)[order]
+
+        gammas = [self.gamma] * len(sites)
+        if "MedianDoseDev" in self.columns:
+            dosedev = self["MedianDoseDev"].to_numpy(dtype=float)[order]
+            with np.errstate(invalid="ignore"):
+                gammas = [np.sqrt((0.5 ** 2) / (2 ** 2) + (np.nanmean(dosedev[start:stop]) ** 2) / (0.03 ** 2))
+                          for start, stop in zip(bounds[:-1], bounds[1:])]
+
+        tasks = [(start, stop, methods, selected_columns, confidence_level, gamma)
+                 for start, stop, gamma in zip(bounds[:-1], bounds[1:], gammas)]
+        site_rows = self._map_sites(_site_spc_rows, X, tasks, max_workers)
+
+        ids = self["ID"].to_numpy()[order]
+        table = []
+        for site, start, rows in zip(sites, bounds[:-1], site_rows):
+            for row in rows:
+                outlier_rows = row.pop("outlier_rows")
+                table.append({"Site of cancer": site, **row,
+                              "Out-of-Control IDs": list(ids[start + outlier_rows])})
+        return pd.DataFrame(table, columns=["Site of cancer", "Method", "GPR Column", "Mean (X̄)", "Counts",
+                                            "LCL", "UCL", "LSL", "USL", "Out-of-Control IDs"])
+
+    bootstrap_pool_min_values = 20_000_000  # bootstrap_limits: resampled values from which workers pay off
+
+    def bootstrap_limits(self, methods=None, confidence_level="99.73%", selected_columns=None, n_boot=10_000,
+                         ci=0.95, block_length=None, seed=None, max_workers=None):
+        """
+        Bootstrap percentile intervals of the control and action limits.
+        - Moving-block bootstrap of each column's valid series: blocks of `block_length` consecutive
+          values (default n^(1/3)) keep most moving ranges of the original order.
+        - Replicates are resampled in batches and evaluated as the columns of one matrix with
+          criteria_statistics and criteria_limits; every method reuses the same replicates.
+        - One criterion per worker process (as for compute_spc_by_site, small runs stay in this process).
+        - Returns a table indexed by method and column with the `ci` interval ("Low"/"High") of each
+          limit, rounded as on the charts; NaN where the limit does not exist or n < 2.
+        """
+        methods = list(self.spc_methods) if methods is None else list(methods)
+        for method in methods:
+            if method not in self.spc_methods:
+                raise ValueError(f"Unknown SPC method '{method}'. Try one of: {list(self.spc_methods.keys())}")
+        if selected_columns is None:
+            selected_columns = self.present_criteria
+        selected_columns = list(selected_columns)
+        self.get_z_info(confidence_level)  # fail here rather than in every worker
+
+        series = [self[column].dropna().to_numpy(dtype=float) for column in selected_columns]
+        seeds = np.random.SeedSequence(seed).spawn(len(selected_columns))
+        tasks = [(values, column == "Global Mean Gamma Index", methods, confidence_level, self.gamma,
+                  n_boot, ci, block_length, column_seed)
+                 for column, values, column_seed in zip(selected_columns, series, seeds)]
+        if max_workers is None:
+            total = n_boot * sum(values.size for values in series)
+            max_workers = min(len(tasks), os.cpu_count() or 1) if total >= self.bootstrap_pool_min_values else 1
+
+        if max_workers <= 1 or len(tasks) <= 1:
+            intervals = [_bootstrap_intervals(*task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                intervals = list(pool.map(_bootstrap_intervals, *zip(*tasks)))
+
+        table = []
+        for column, column_intervals in zip(selected_columns, intervals):
+            is_gamma = column == "Global Mean Gamma Index"
+            for method in methods:
+                bounds = column_intervals[method]  # limit -> (low, high)
+                row = {"Method": method, "GPR Column": column}
+                for side, end in (("Low", 0), ("High", 1)):
+                    LSL = None if is_gamma else bounds["LSL"][end]
+                    USL = bounds["USL"][end] if is_gamma else None
+                    LCL, UCL, LSL, USL = self.round_limits(column, bounds["LCL"][end], bounds["UCL"][end], LSL, USL)
+                    for key, value in (("LCL", LCL), ("UCL", UCL), ("LSL", LSL), ("USL", USL)):
+                        row[f"{key} CI {side}"] = np.nan if value is None else value
+                table.append(row)
+        columns = [f"{key} CI {side}" for key in ("LCL", "UCL", "LSL", "USL") for side in ("Low", "High")]
+        return pd.DataFrame(table).set_index(["Method", "GPR Column"])[columns]
+
+    def spc_monitor(self, column, method="shewhart", confidence_level="99.73%"):
+        """
+        Streaming SPC monitor for one criterion, seeded with the current (non-missing) values.
+        New plans are scored with SPCMonitor.update() as they are measured.
+        """
+        return SPCMonitor(column, method, confidence_level, history=self[column].dropna().to_numpy(dtype=float),
+                          gamma=self.gamma, df=self)
 
-            figures.append(fig)
+    def _get_x_chart_figs(self, method, confidence_level="99.73%", selected_columns=None, n_boot=0):
+        """
+        Shared body of the get_*_x_chart_figs methods: runs compute_spc and builds every figure.
+        """
+        results = self.compute_spc(method, confidence_level, selected_columns, n_boot)
 
-            results_list.append({
-                "GPR Column": column,
-                "Mean (X̄)": self.round_half_up(CL, 1),
-                "Counts": valid_data_rounded.count(),
-                "LCL": LCL,
-                "UCL": UCL,
-                "LSL": LSL if LSL is not None else None,
-                "USL": USL if USL is not None else None,
-                "Out-of-Control IDs": list(out_of_control_info["ID"].values)
-            })
+        figures = [result.figure for result in results]
+        outlier_dict = {result.column: result.out_of_control_ids for result in results}
+        results_list = [result.summary_row() for result in results]
 
         return figures, outlier_dict, results_list
 
-    def get_sc_x_chart_figs(self, confidence_level="99.73%", selected_columns=None):
+    def get_shewhart_x_chart_figs(self, confidence_level="99.73%", selected_columns=None, n_boot=0):
         """
         Return matplotlib figures for GUI display for selected columns.
         """
-        alpha, Z_alpha = self.get_z_info(confidence_level)
-        bita = self.b
-        d2 = 1.128
+        return self._get_x_chart_figs("shewhart", confidence_level, selected_columns, n_boot)
 
-        k3_values = np.array([0.00, 0.40, 0.80, 1.20, 1.60, 2.00, 2.40, 2.80, 3.20, 3.60, 4.00])
-        d2_sc_values = np.array([1.12, 1.12, 1.11, 1.08, 1.05, 1.02, 0.98, 0.95, 0.92, 0.90, 0.88])
+    def get_swv_x_chart_figs(self, confidence_level="99.73%", selected_columns=None, n_boot=0):
+        """
+        Return matplotlib figures for GUI display for selected columns.
+        """
+        return self._get_x_chart_figs("swv", confidence_level, selected_columns, n_boot)
 
-        interp_d2_sc = interp1d(k3_values, d2_sc_values, kind='linear', fill_value="extrapolate")
+    def get_wsd_x_chart_figs(self, confidence_level="99.73%", selected_columns=None, n_boot=0):
+        """
+        Return matplotlib figures for GUI display for selected columns.
+        """
+        return self._get_x_chart_figs("wsd", confidence_level, selected_columns, n_boot)
 
-        figures = []
-        results_list = []
+    def get_sc_x_chart_figs(self, confidence_level="99.73%", selected_columns=None, n_boot=0):
+        """
+        Return matplotlib figures for GUI display for selected columns.
+        """
+        return self._get_x_chart_figs("sc", confidence_level, selected_columns, n_boot)
 
-        outlier_dict = {}
-        for column in selected_columns:
-            valid_data = self[column].dropna()
-            USL = None
-            LSL = None
-            MR = np.abs(np.diff(valid_data))
-            mean_MR = np.mean(MR)
-            CL = np.mean(valid_data)
-
-            k3 = skew(valid_data)  # Using built-in skewness function
-            d2_sc = interp_d2_sc(abs(k3))
-            skew_factor = (1 / 6) * (Z_alpha ** 2 - 1) * k3 / (1 + 0.2 * k3 ** 2)
-
-            if column == "Global Mean Gamma Index":
-                # TOLERANCE
-                UCL = CL + (Z_alpha + skew_factor) * (mean_MR / d2_sc)
-                LCL = 0
-                # ACTION
-                skew_factor_action = (4 / 3) * k3 / (1 + 0.2 * k3 ** 2)
-                T = self.gamma
-                DA_2 = np.sqrt(((3 + skew_factor_action) * (mean_MR / d2_sc)) ** 2 + (3 * (CL - T)) ** 2)
-                USL = CL + DA_2
-            else:
-                # TOLERANCE
-                UCL = 100
-                LCL = CL + (-Z_alpha + skew_factor) * (mean_MR / d2_sc)
-                # ACTION
-                skew_factor_action = (4 / 3) * k3 / (1 + 0.2 * k3 ** 2)
-                T = 100
-                DA_2 = np.sqrt(((-3 + skew_factor_action) * (mean_MR / d2_sc)) ** 2 + (3 * (CL - T)) ** 2)
-                LSL = CL - DA_2
+    def get_ewma_chart_figs(self, confidence_level="99.73%", selected_columns=None):
+        """
+        Return EWMA chart figures for GUI display for selected columns.
+        """
+        return self._get_x_chart_figs("ewma", confidence_level, selected_columns)
 
-            LCL, UCL, LSL, USL, out_of_control, out_of_control_info, valid_data_rounded = self.define_outliers(
-                valid_data, column, LCL, UCL, LSL, USL)
+    def get_cusum_chart_figs(self, confidence_level="99.73%", selected_columns=None):
+        """
+        Return CUSUM chart figures for GUI display for selected columns.
+        """
+        return self._get_x_chart_figs("cusum", confidence_level, selected_columns)
 
-            outlier_dict[column] = list(out_of_control_info["ID"].values)
+    def running_sums(self, column):
+        """
+        Sum of the values and sum of the moving ranges of a criterion (missing values skipped).
+        Created on the first elimination in the column and then updated by remove_from_sums.
+        """
+        sums = self.spc_sums.get(column)
+        if sums is None:
+            values = self[column].dropna().to_numpy(dtype=float)
+            sums = {"sum": values.sum(), "sum_MR": np.abs(np.diff(values)).sum()}
+            self.spc_sums[column] = sums
+        return sums
+
+    def remove_from_sums(self, column, positions):
+        """
+        Delta update of the running sums for eliminating the values at row `positions`
+        (call it before the values are set to NaN).
+        - The moving ranges touching a run of removed values are replaced by one between the values
+          around the run (vectorized, so long runs cost no more than isolated points).
+        """
+        if not pd.api.types.is_numeric_dtype(self[column]):
+            return  # not analysed (non-numeric input)
+        values = self[column].to_numpy(dtype=float)
+        sums = self.running_sums(column)
+
+        valid = ~np.isnan(values)
+        remove = np.zeros(values.size, dtype=bool)
+        remove[np.asarray(positions, dtype=int)] = True
+        # Work on the valid series: removed values form runs between the values that stay
+        series = values[valid]
+        removed = remove[valid]
+        if not removed.any():
+            return
+
+        sums["sum"] -= series[removed].sum()
+        touched = removed[:-1] | removed[1:]  # moving ranges with a removed end
+        sums["sum_MR"] -= np.abs(np.diff(series))[touched].sum()
+        edges = np.diff(np.concatenate(([0], removed.astype(np.int8), [0])))
+        before = np.flatnonzero(edges == 1) - 1  # value before each run of removed values
+        after = np.flatnonzero(edges == -1)      # value after it
+        bridged = (before >= 0) & (after < series.size)
+        sums["sum_MR"] += np.abs(series[after[bridged]] - series[before[bridged]]).sum()
+
+    def id_positions(self, ids):
+        """
+        Row positions of `ids` (-1 for unknown IDs), looked up in a hash index of the ID column.
+        - The index is built on first use and dropped when the rows are re-sorted.
+        - For a repeated ID the first row is used.
+        """
+        if self.id_index is None:
+            id_column = self["ID"]
+            first = ~id_column.duplicated().to_numpy()
+            self.id_index = (pd.Index(id_column.to_numpy()[first]), np.flatnonzero(first))
+        index, positions = self.id_index
+        found = index.get_indexer(list(ids))
+        return np.where(found >= 0, positions[found], -1)
+
+    def eliminate_ids(self, criteria, ids, round_num=None, method=None):
+        """
+        Eliminate `criteria` for every ID in `ids` as one new round (layer), see ELIMINATION LAYERS.
+        - Values already eliminated by an earlier round are left to that round.
+        - Returns the log entries (round, criterion, 'ID, value) of this round, one per ID and criterion.
+        """
+        ids = list(dict.fromkeys(ids))
+        positions = self.id_positions(ids)
+        positions = positions[positions >= 0]
+        layer = self.eliminate_positions({crit: positions for crit in criteria}, round_num, method)
+        return [entry[:1] + entry[2:] for entry in self._layer_log(layer)]
 
-            fig = self.plot_x_chart(
-                pdf=None,
-                column=column,
-                CL=CL,
-                UCL=UCL,
-                LCL=LCL,
-                USL=USL,
-                LSL=LSL,
-                data_to_plot=valid_data_rounded,
-                out_of_control=out_of_control,
-                confidence_level=confidence_level,
-                method_name="SC"
-            )
+    def eliminate_positions(self, positions_by_criterion, round_num=None, method=None):
+        """
+        Eliminate the row positions given per criterion as one new round (layer) and return the layer.
+        """
+        masks = {}
+        for crit, positions in positions_by_criterion.items():
+            if crit not in self.original_values:
+                self.original_values[crit] = self[crit].to_numpy(copy=True)
+                self.exclusion_masks[crit] = np.zeros(len(self), dtype=bool)
+            mask = np.zeros(len(self), dtype=bool)
+            mask[positions] = True
+            masks[crit] = mask & ~self.exclusion_masks[crit]
+
+        layer = {
+            "round": len(self.elimination_layers) + 1 if round_num is None else round_num,
+            "method": method,
+            "positions": pd.unique(np.concatenate([np.asarray(positions, dtype=int)  # first-seen order
+                                                   for positions in positions_by_criterion.values()]
+                                                  + [np.array([], dtype=int)])),
+            "masks": masks,
+        }
+        self._apply_layer(layer)
+        self.elimination_layers.append(layer)
+        self.redo_layers = []
+        return layer
 
-            figures.append(fig)
+    def auto_eliminate(self, method="shewhart", confidence_level="99.73%", selected_columns=None, max_rounds=20):
+        """
+        Headless iterative elimination: every round removes all out-of-control points of the selected
+        criteria and recomputes the limits, until no point is out of control or after `max_rounds` rounds.
+        - As in the GUI, a point out of control in "Global 3%2mm" is removed from every criterion.
+        - Each round is one elimination layer, so it can be undone like a manual round.
+        - Only the limits are computed between rounds (no SPCResult, no figure).
+        - Returns the log of its rounds, in the format of elimination_log.
+        """
+        if selected_columns is None:
+            selected_columns = self.present_criteria
+        selected_columns = list(selected_columns)
+        all_criteria = [crit for crit in self.criteria if crit in self.columns]
+
+        layers = []
+        for _ in range(max_rounds):
+            limits_df = self.compute_spc_limits(method, confidence_level, selected_columns)
+            rounded = self.round_half_up_array(self.criteria_matrix(selected_columns), 2)
+
+            outliers = {}
+            for j, (column, row) in enumerate(limits_df.iterrows()):
+                is_gamma = column == "Global Mean Gamma Index"
+                LCL, UCL, _, _ = self.round_limits(column, row["LCL"], row["UCL"],
+                                                   None if is_gamma else row["LSL"], row["USL"] if is_gamma else None)
+                with np.errstate(invalid="ignore"):
+                    positions = np.flatnonzero((rounded[:, j] > UCL) | (rounded[:, j] < LCL))
+                if positions.size:
+                    outliers[column] = positions
+            if not outliers:
+                break
+
+            by_criterion = {crit: positions for crit, positions in outliers.items()}
+            if "Global 3%2mm" in outliers:
+                for crit in all_criteria:
+                    by_criterion[crit] = np.union1d(by_criterion.get(crit, []), outliers["Global 3%2mm"]).astype(int)
+            layers.append(self.eliminate_positions(by_criterion, method=method))
+
+        return [entry for layer in layers for entry in self._layer_log(layer)]
 
-            results_list.append({
+    def elimination_recalculate_gui(self, method="shewhart", confidence_level="99.73%",
+                                    selected_criterion=None, selected_ids=None, round_num=None):
+        """
+        Eliminates the selected IDs from one criterion, or from every criterion for "Global 3%2mm".
+        Returns the elimination log entries.
+        """
+        if selected_criterion == "Global 3%2mm" or selected_criterion in self.multivariate_methods.values():
+            criteria = [crit for crit in self.criteria if crit in self.columns]
+        else:
+            criteria = [selected_criterion]
+        return self.eliminate_ids(criteria, selected_ids, round_num, method)
+
+    # ===================== ELIMINATION LAYERS ===================== #
+    # Every elimination round is a layer: one boolean exclusion mask per criterion it touched.
+    # The untouched values are kept in original_values, so rounds can be undone, redone or
+    # reset without reloading the file. The frame itself always holds NaN for excluded values.
+
+    def _apply_layer(self, layer):
+        for crit, mask in layer["masks"].items():
+            positions = np.flatnonzero(mask)
+            self.remove_from_sums(crit, positions)
+            self.exclusion_masks[crit] |= mask
+            self.iloc[positions, self.columns.get_loc(crit)] = np.nan
+        self.bump_data_version(layer["masks"])
+
+    def _restore_layer(self, layer):
+        for crit, mask in layer["masks"].items():
+            positions = np.flatnonzero(mask)
+            self.exclusion_masks[crit] &= ~mask
+            self.iloc[positions, self.columns.get_loc(crit)] = self.original_values[crit][positions]
+            self.spc_sums.pop(crit, None)  # summed again from the restored column
+        self.bump_data_version(layer["masks"])
+
+    def undo_elimination(self):
+        """Undo the last elimination round. Returns the criteria it changed."""
+        if not self.elimination_layers:
+            return []
+        layer = self.elimination_layers.pop()
+        self._restore_layer(layer)
+        self.redo_layers.append(layer)
+        return list(layer["masks"])
+
+    def redo_elimination(self):
+        """Apply the last undone elimination round again. Returns the criteria it changed."""
+        if not self.redo_layers:
+            return []
+        layer = self.redo_layers.pop()
+        self._apply_layer(layer)
+        self.elimination_layers.append(layer)
+        return list(layer["masks"])
+
+    def reset_eliminations(self):
+        """Restore every eliminated value and clear the rounds. Returns the criteria it changed."""
+        changed = [crit for crit, mask in self.exclusion_masks.items() if mask.any()]
+        for crit in changed:
+            self.iloc[:, self.columns.get_loc(crit)] = self.original_values[crit]
+            self.spc_sums.pop(crit, None)
+        self.bump_data_version(changed)
+        self.original_values = {}
+        self.exclusion_masks = {}
+        self.elimination_layers = []
+        self.redo_layers = []
+        return changed
+
+    def _layer_log(self, layer):
+        ids = self["ID"].to_numpy()
+        return [(layer["round"], layer["method"], crit, f"'{ids[position]}", self.original_values[crit][position])
+                for position in layer["positions"]
+                for crit, mask in layer["masks"].items() if mask[position]]
+
+    def elimination_log(self):
+        """Log of the applied rounds: (round, method, criterion, 'ID, eliminated value) per value."""
+        return [entry for layer in self.elimination_layers for entry in self._layer_log(layer)]
+
+    def _carry_eliminations(self, df, order):
+        """
+        Move the elimination layers to `df`, the frame merged by refresh
+        (`order` is the take order returned by merge_sorted_rows).
+        """
+        old_slot = np.flatnonzero(order < len(self))  # merged position of every old row
+
+        def move(mask):
+            moved = np.zeros(len(df), dtype=bool)
+            moved[old_slot] = mask
+            return moved
+
+        for crit, original in self.original_values.items():
+            values = df[crit].to_numpy(copy=True)  # the new rows are not eliminated
+            values[old_slot] = original
+            df.original_values[crit] = values
+            df.exclusion_masks[crit] = move(self.exclusion_masks[crit])
+        for name in ("elimination_layers", "redo_layers"):
+            setattr(df, name, [{**layer,
+                                "positions": old_slot[layer["positions"]],
+                                "masks": {crit: move(mask) for crit, mask in layer["masks"].items()}}
+                               for layer in getattr(self, name)])
+
+
+# ===================== PER-SITE WORKERS ===================== #
+
+def _site_spc_rows(X, methods, columns, confidence_level, gamma):
+    """
+    SPC summary rows of one site (criteria matrix with rows in time order), for every method.
+    Same statistics, limits and rounding as compute_spc; outliers are returned as row numbers.
+    """
+    helper = DataframeForAnalysis()
+    alpha, Z_alpha = helper.get_z_info(confidence_level)
+    stats = DataframeForAnalysis.criteria_statistics(X)
+    is_gamma = [column == "Global Mean Gamma Index" for column in columns]
+    rounded = helper.round_half_up_array(X, 2)
+
+    rows = []
+    for method in methods:
+        limits = DataframeForAnalysis.criteria_limits(stats, method, alpha, Z_alpha, is_gamma, gamma)
+        for j, column in enumerate(columns):
+            LSL = None if is_gamma[j] else limits["LSL"][j]
+            USL = limits["USL"][j] if is_gamma[j] else None
+            LCL, UCL, LSL, USL = helper.round_limits(column, limits["LCL"][j], limits["UCL"][j], LSL, USL)
+            rows.append({
+                "Method": method,
                 "GPR Column": column,
-                "Mean (X̄)": self.round_half_up(CL, 1),
-                "Counts": valid_data_rounded.count(),
+                "Mean (X̄)": helper.round_half_up(stats["CL"][j], 1),
+                "Counts": int(stats["n"][j]),
                 "LCL": LCL,
                 "UCL": UCL,
-                "LSL": LSL if LSL is not None else None,
-                "USL": USL if USL is not None else None,
-                "Out-of-Control IDs": list(out_of_control_info["ID"].values)
+                "LSL": LSL,
+                "USL": USL,
+                "outlier_rows": np.flatnonzero((rounded[:, j] > UCL) | (rounded[:, j] < LCL)),
             })
+    return rows
 
-        return figures, outlier_dict, results_list
 
-    def elimination_recalculate_gui(self, method="shewhart", confidence_level="99.73%",
-                                    selected_criterion=None, selected_ids=None, round_num=1):
+def _site_worker(rows_function, shm_name, shape, start, stop, *args):
+    """Process-pool entry point: reads its site's rows from the shared criteria matrix."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        X = np.ndarray(shape, dtype=float, buffer=shm.buf)[start:stop].copy()
+    finally:
+        shm.close()
+    return rows_function(X, *args)
+
 
-        eliminated_log = []  # To store tuples like (criterion, ID, value)
+def _site_normality_rows(X, columns):
+    """Normality table of one site (see DataframeForAnalysis.normality_table)."""
+    return DataframeForAnalysis.normality_table(X, columns)
 
-        criterion = selected_criterion
-        IDs_input = selected_ids
 
-        valid_methods = {
-            "shewhart": self.get_shewhart_x_chart_figs,
-            "swv": self.get_swv_x_chart_figs,
-            "wsd": self.get_wsd_x_chart_figs,
-            "sc": self.get_sc_x_chart_figs
+# ===================== REPORT WORKERS ===================== #
+
+def _init_report_worker():
+    plt.switch_backend("Agg")  # no GUI in the workers
+
+
+def _report_page_figure(kind, arguments):
+    """Figure of one report page (see DataframeForAnalysis.export_pdf)."""
+    if kind == "x_chart":
+        return DataframeForAnalysis().plot_x_chart(**arguments)
+    if kind == "histogram":
+        sns.set_style("darkgrid")
+        fig, ax = plt.subplots(figsize=(8, 4))
+        DataframeForAnalysis._draw_histogram(ax, arguments["values"], arguments["shape"])
+        return fig
+    raise ValueError(f"Unknown report page kind '{kind}'.")
+
+
+def _render_report_page(page):
+    """Worker: one report page as the bytes of a single-page PDF."""
+    kind, arguments, savefig_kwargs = page
+    fig = _report_page_figure(kind, arguments)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="pdf", **savefig_kwargs)
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+# ===================== BOOTSTRAP WORKERS ===================== #
+
+def _bootstrap_intervals(values, is_gamma, methods, confidence_level, gamma, n_boot, ci, block_length, seed):
+    """
+    Percentile intervals of the (unrounded) limits of one criterion for every method.
+    `values` is its valid series in time order; returns {method: {limit: (low, high)}}.
+    """
+    helper = DataframeForAnalysis()
+    alpha, Z_alpha = helper.get_z_info(confidence_level)
+    n = values.size
+    nan_bounds = (np.nan, np.nan)
+    if n < 2 or n_boot < 1:
+        return {method: dict.fromkeys(("LCL", "UCL", "LSL", "USL"), nan_bounds) for method in methods}
+
+    L = min(n, max(1, int(np.ceil(n ** (1 / 3)))) if block_length is None else int(block_length))
+    n_blocks = -(-n // L)
+    offset = np.arange(L)
+    rng = np.random.default_rng(seed)
+
+    samples = {method: {key: np.empty(n_boot) for key in ("LCL", "UCL", "LSL", "USL")} for method in methods}
+    batch = max(1, 2_000_000 // n)
+    for first in range(0, n_boot, batch):
+        rows = slice(first, min(first + batch, n_boot))
+        starts = rng.integers(0, n - L + 1, size=(rows.stop - rows.start, n_blocks))
+        index = (starts[:, :, None] + offset).reshape(len(starts), -1)[:, :n]
+        stats = DataframeForAnalysis.criteria_statistics(values[index].T)  # one replicate per column
+        for method in methods:
+            limits = DataframeForAnalysis.criteria_limits(stats, method, alpha, Z_alpha, [is_gamma], gamma)
+            for key, value in limits.items():
+                samples[method][key][rows] = value
+
+    tails = [(1 - ci) / 2, (1 + ci) / 2]
+    intervals = {}
+    for method in methods:
+        intervals[method] = {}
+        for key, value in samples[method].items():
+            if np.isnan(value).all():  # the missing action limit
+                intervals[method][key] = nan_bounds
+                continue
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                intervals[method][key] = tuple(np.nanquantile(value, tails))
+    return intervals
+
+
+class SPCResult:
+    """
+    Outcome of one SPC I-chart (one method, one column).
+    Holds the limits, the out-of-control indices and IDs and the rounded series.
+    The matplotlib figure is created lazily, the first time `figure` is accessed.
+    """
+
+    top_contributors = 3  # criteria listed per flagged plan of a multivariate chart
+
+    def __init__(self, df, method, column, confidence_level, CL, LCL, UCL, LSL, USL,
+                 out_of_control, out_of_control_ids, data_rounded, intervals=None, rule_violations=None,
+                 mean=None, chart=None, contributions=None):
+        self.df = df
+        self.method = method
+        self.method_name = df.chart_methods[method]
+        self.column = column
+        self.confidence_level = confidence_level
+        self.CL = CL
+        self.LCL = LCL
+        self.UCL = UCL
+        self.LSL = LSL
+        self.USL = USL
+        self.out_of_control = out_of_control
+        self.out_of_control_ids = out_of_control_ids
+        self.data_rounded = data_rounded
+        self.intervals = intervals  # bootstrap "<limit> CI Low/High" bounds, see bootstrap_limits
+        self.rule_violations = rule_violations or {}  # run rule -> index of the points completing it
+        self.mean = mean  # X̄ of the series when the chart plots another statistic (EWMA, CUSUM)
+        self.chart = chart or {}  # plot_x_chart arguments of such charts
+        self.contributions = contributions  # Hotelling T²: flagged plans x criteria, share of T² (%)
+
+    @property
+    def figure_key(self):
+        """Key of this result's chart in the figure pool (see FIGURE POOL)."""
+        return self.method, self.column
+
+    @property
+    def run_rule_points(self):
+        """Index of the points completing any run rule."""
+        points = [points for points in self.rule_violations.values() if len(points)]
+        return points[0].append(points[1:]).unique() if points else None
+
+    def release_figure(self):
+        """Let go of the I-chart; it goes back to the figure pool and is drawn again on the next access."""
+        self.df.release_figure(self.figure_key, self)
+
+    @property
+    def figure(self):
+        """
+        The I-chart of this result, drawn on first access into the pooled figure of its method and
+        criterion (see FIGURE POOL), which it holds until another result of the same key is drawn.
+        """
+        figure = self.df.owned_figure(self.figure_key, self)
+        if figure is None:
+            figure = self.df.pooled_x_chart(self.figure_key, self, **self.chart_arguments())
+        return figure
+
+    def chart_arguments(self):
+        """plot_x_chart arguments of this result's I-chart: plain data, also used by the report workers."""
+        return dict(
+            column=self.column,
+            CL=self.CL,
+            UCL=self.UCL,
+            LCL=self.LCL,
+            USL=self.USL,
+            LSL=self.LSL,
+            data_to_plot=self.data_rounded,
+            out_of_control=self.out_of_control,
+            confidence_level=self.confidence_level,
+            method_name=self.method_name,
+            run_rule_points=self.run_rule_points,
+            **self.chart
+        )
+
+    def summary_row(self):
+        """
+        Row of the SPC summary table (same keys as the results_list of get_*_x_chart_figs).
+        Rolling results report their latest limits; bootstrapped results add a
+        "<limit> CI" (low, high) entry per limit.
+        "Run-Rule Violations" maps every violated run rule to the IDs of the points completing it.
+        Multivariate results add "Top Contributors": ID -> the criteria making up most of its T².
+        """
+        def latest(value):
+            return value[-1] if np.ndim(value) else value
+
+        row = {
+            "GPR Column": self.column,
+            "Mean (X̄)": self.df.round_half_up(latest(self.CL if self.mean is None else self.mean), 1),
+            "Counts": self.data_rounded.count(),
+            "LCL": latest(self.LCL),
+            "UCL": latest(self.UCL),
+            "LSL": latest(self.LSL) if self.LSL is not None else None,
+            "USL": latest(self.USL) if self.USL is not None else None,
+            "Out-of-Control IDs": self.out_of_control_ids,
+            "Run-Rule Violations": {rule: list(self.df.loc[points, "ID"].values)
+                                    for rule, points in self.rule_violations.items() if len(points)}
+        }
+        if self.contributions is not None:
+            row["Top Contributors"] = {
+                self.df.loc[index, "ID"]: list(shares.nlargest(self.top_contributors).index)
+                for index, shares in self.contributions.iterrows()
+            }
+        if self.intervals is not None:
+            for key in ("LCL", "UCL", "LSL", "USL"):
+                row[f"{key} CI"] = (self.intervals[f"{key} CI Low"], self.intervals[f"{key} CI High"])
+        return row
+
+
+class GridCounter:
+    """
+    Multiset of values that counts the values ≤ x, for the P_X of SPCMonitor.
+    - A Fenwick tree over a fixed grid (0.01 steps from 0 to 100: the rounding of the GPRs, and
+      the range of the GPRs and the mean γ) counts the values of the buckets below x.
+    - The bucket of x is counted exactly from its distinct values. Values between grid points or
+      beyond the grid (clamped to the edge buckets) are therefore still counted exactly.
+    - add and count_le cost O(log buckets + distinct values in one bucket), and memory is bounded
+      by the grid and the distinct values, not by the number of values added.
+    """
+
+    def __init__(self, values=(), low=0.0, high=100.0, step=0.01):
+        self.low = low
+        self.step = step
+        self.size = int(round((high - low) / step)) + 1
+        self.buckets = {}  # bucket -> {value: count}
+        values = np.asarray(values, dtype=float)
+        counts = np.zeros(self.size + 1, dtype=np.int64)
+        if values.size:
+            distinct, repeats = np.unique(values, return_counts=True)
+            for value, bucket, count in zip(distinct.tolist(), self._buckets(distinct).tolist(), repeats.tolist()):
+                self.buckets.setdefault(bucket, {})[value] = count
+                counts[bucket + 1] += count
+        # Fenwick tree built in place from the bucket counts (1-based)
+        tree = counts
+        for i in range(1, self.size + 1):
+            parent = i + (i & -i)
+            if parent <= self.size:
+                tree[parent] += tree[i]
+        self.tree = tree.tolist()
+
+    def _buckets(self, values):
+        # monotone in the value, so lower buckets only hold smaller values
+        return np.clip(np.floor((values - self.low) / self.step), 0, self.size - 1).astype(np.int64)
+
+    def _bucket(self, value):
+        return min(max(int(np.floor((value - self.low) / self.step)), 0), self.size - 1)
+
+    def add(self, value):
+        bucket = self._bucket(value)
+        values = self.buckets.setdefault(bucket, {})
+        values[value] = values.get(value, 0) + 1
+        i = bucket + 1
+        while i <= self.size:
+            self.tree[i] += 1
+            i += i & -i
+
+    def count_le(self, x):
+        """Number of values ≤ x."""
+        bucket = self._bucket(x)
+        count = sum(c for value, c in self.buckets.get(bucket, {}).items() if value <= x)
+        i = bucket  # buckets 0 .. bucket - 1
+        while i > 0:
+            count += self.tree[i]
+            i -= i & -i
+        return count
+
+
+class SPCMonitor:
+    """
+    Online SPC limits for one criterion.
+    Keeps running sums instead of the full history: count, mean, M2/M3 (Welford/Terriberry
+    updates, for the SC skewness), the sum of moving ranges and the last value. P_X (WSD/SWV)
+    needs the count of values ≤ the mean, which moves with every plan; a GridCounter keeps it
+    at O(log) cost per plan and memory bounded by the 0.01 grid of the GPRs.
+    Limits are the same as compute_spc_limits() over the same history, up to float summation order.
+    """
+
+    def __init__(self, column, method="shewhart", confidence_level="99.73%", history=None, gamma=None, df=None):
+        if method not in DataframeForAnalysis.spc_methods:
+            raise ValueError(f"Unknown SPC method '{method}'. "
+                             f"Try one of: {list(DataframeForAnalysis.spc_methods.keys())}")
+        self.df = df if df is not None else DataframeForAnalysis()
+        self.column = column
+        self.method = method
+        self.confidence_level = confidence_level
+        self.alpha, self.Z_alpha = self.df.get_z_info(confidence_level)
+        self.is_gamma = column == "Global Mean Gamma Index"
+        self.gamma = gamma  # γ target of the mean γ index, fixed at seeding
+
+        history = np.asarray([] if history is None else history, dtype=float)
+        history = history[~np.isnan(history)]
+        self.n = history.size
+        self.mean = history.mean() if self.n else 0.0
+        dev = history - self.mean
+        self.M2 = float(np.sum(dev * dev))
+        self.M3 = float(np.sum(dev * dev * dev))
+        self.sum_MR = float(np.sum(np.abs(np.diff(history))))
+        self.last = history[-1] if self.n else None
+        self.counter = GridCounter(history)
+        self._limits = None
+
+    def add(self, value):
+        """Add one value to the running statistics (NaN is ignored, like dropna)."""
+        if value is None or np.isnan(value):
+            return
+        value = float(value)
+        n1 = self.n
+        self.n += 1
+        delta = value - self.mean
+        delta_n = delta / self.n
+        term1 = delta * delta_n * n1
+        self.mean += delta_n
+        self.M3 += term1 * delta_n * (self.n - 2) - 3 * delta_n * self.M2
+        self.M2 += term1
+        if self.last is not None:
+            self.sum_MR += abs(value - self.last)
+        self.last = value
+        self.counter.add(value)
+        self._limits = None
+
+    def statistics(self):
+        """Current statistics in the format of criteria_statistics (1-element arrays)."""
+        n = self.n
+        with np.errstate(invalid="ignore", divide="ignore"):
+            CL = self.mean if n else np.nan
+            mean_MR = self.sum_MR / (n - 1) if n > 1 else np.nan
+            P_X = self.counter.count_le(CL) / n if n else np.nan
+            m2 = self.M2 / n if n else np.nan
+            k3 = (self.M3 / n) / m2 ** 1.5 if n and m2 > (np.finfo(float).eps * CL) ** 2 else np.nan
+        return {key: np.array([value], dtype=float) for key, value in
+                {"n": n, "CL": CL, "mean_MR": mean_MR, "P_X": P_X, "k3": k3}.items()}
+
+    @property
+    def limits(self):
+        """Current rounded (LCL, UCL, LSL, USL), as define_outliers reports them; None before two values."""
+        if self.n < 2:
+            return None, None, None, None
+        if self._limits is None:
+            limits = DataframeForAnalysis.criteria_limits(self.statistics(), self.method, self.alpha,
+                                                          self.Z_alpha, [self.is_gamma], self.gamma)
+            LCL, UCL, LSL, USL = (limits[key][0] for key in ("LCL", "UCL", "LSL", "USL"))
+            LSL = None if np.isnan(LSL) else LSL
+            USL = None if np.isnan(USL) else USL
+            self._limits = self.df.round_limits(self.column, LCL, UCL, LSL, USL)
+        return self._limits
+
+    def score(self, value):
+        """True if `value` is out of control against the current limits (None without limits yet)."""
+        LCL, UCL, LSL, USL = self.limits
+        if UCL is None:
+            return None
+        value = self.df.round_half_up(value, 2)
+        return bool(value > UCL or value < LCL)
+
+    def update(self, value, plan_id=None, learn=True):
+        """
+        Score a newly measured plan against the limits of the history so far, then add it
+        to the history (unless `learn` is False, e.g. for a plan that will be eliminated).
+        Returns a dict with the plan's value, the limits it was checked against and the verdict.
+        """
+        LCL, UCL, LSL, USL = self.limits
+        out_of_control = None if value is None or np.isnan(value) else self.score(value)
+        if learn:
+            self.add(value)
+        return {
+            "ID": plan_id,
+            "GPR Column": self.column,
+            "Value": value,
+            "LCL": LCL,
+            "UCL": UCL,
+            "LSL": LSL,
+            "USL": USL,
+            "Out of Control": out_of_control
         }
 
-        if criterion == "Global 3%2mm":
-            for ID in IDs_input:
-                row = self[self["ID"] == ID]
-                if not row.empty:
-                    row_index = row.index[0]  # Only one row should match
-                    for crit in self.criteria:
-                        if crit in self.columns:
-                            value = self.at[row_index, crit]
-                            self.at[row_index, crit] = np.nan
-                            eliminated_log.append((round_num, crit, f"'{ID}", value))
-        else:
-            for ID in IDs_input:
-                row = self[self["ID"] == ID]
-                if not row.empty:
-                    row_index = row.index[0]
-                    value = self.at[row_index, criterion]
-                    self.at[row_index, criterion] = np.nan
-                    eliminated_log.append((round_num, criterion, f"'{ID}", value))
-
-        return eliminated_log
\ No newline at end of file
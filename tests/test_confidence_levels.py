@@ -0,0 +1,26 @@
+import pandas as pd
+import pytest
+
+from dataframe_for_GPR_analysis import DataframeForAnalysis
+
+
+@pytest.fixture(scope="module")
+def df():
+    return DataframeForAnalysis(pd.DataFrame({"x": [0.0]}))
+
+
+@pytest.mark.parametrize("level", ["0.97", "97", "97%", 0.97])
+def test_fraction_and_percentage_forms_agree(df, level):
+    alpha, z = df.get_z_info(level)
+    assert alpha == pytest.approx(0.03)
+    assert z == pytest.approx(2.17009, abs=1e-5)
+
+
+def test_tabulated_levels_keep_their_z(df):
+    assert df.get_z_info("99.73%") == (0.0027, 3.0)
+
+
+@pytest.mark.parametrize("level", ["0.3", "1", "100%", "99.995%", "30", "abc", 1.0])
+def test_levels_outside_the_range_are_rejected(df, level):
+    with pytest.raises(ValueError, match="Unsupported confidence level"):
+        df.get_z_info(level)
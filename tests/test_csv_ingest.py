@@ -0,0 +1,54 @@
+import pandas as pd
+import pytest
+
+from dataframe_for_GPR_analysis import DataframeForAnalysis
+
+
+def template_frame():
+    return pd.DataFrame({
+        "ID": ["001", "002", "003"],
+        "Site of cancer": ["Prostate", "Breast", "Prostate"],
+        "QA Date": ["2024-01-03", "2024-01-01", "2024-01-02"],
+        "Global 3%2mm": [99.1, 98.5, 97.25],
+        "Global 2%2mm": [97.0, 96.4, 95.5],
+        "MedianDoseDev": [0.4, -0.2, 0.1],
+    })
+
+
+@pytest.fixture(autouse=True)
+def no_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(DataframeForAnalysis, "cache_dir", str(tmp_path / "cache"))
+
+
+@pytest.mark.parametrize("encoding", ["utf-8", "utf-8-sig"])
+def test_typed_reader_matches_default_parser(tmp_path, encoding):
+    path = tmp_path / "qa.csv"
+    template_frame().to_csv(path, index=False, encoding=encoding)
+
+    default = DataframeForAnalysis.from_file(str(path), use_cache=False)
+    typed = DataframeForAnalysis.from_file(str(path), use_cache=False, fast_csv=True)
+
+    assert typed["ID"].tolist() == default["ID"].tolist() == ["002", "003", "001"]
+    assert typed.data_for_analysis == default.data_for_analysis
+    pd.testing.assert_series_equal(typed["Global 3%2mm"], default["Global 3%2mm"])
+
+
+def test_typed_reader_strips_byte_order_mark(tmp_path):
+    path = tmp_path / "excel.csv"
+    template_frame().to_csv(path, index=False, encoding="utf-8-sig")  # Excel's "CSV UTF-8"
+
+    data = DataframeForAnalysis.read_csv_typed(str(path))
+    assert list(data.columns)[0] == "ID"
+    assert data["ID"].tolist() == ["001", "002", "003"]
+
+
+def test_refresh_of_file_with_byte_order_mark(tmp_path):
+    path = tmp_path / "excel.csv"
+    template_frame().to_csv(path, index=False, encoding="utf-8-sig")
+    df = DataframeForAnalysis.from_file(str(path), fast_csv=True)
+
+    extra = template_frame().iloc[:1].assign(ID="004", **{"QA Date": "2024-01-04"})
+    extra.to_csv(path, mode="a", header=False, index=False)
+    refreshed = df.refresh()
+
+    assert refreshed["ID"].tolist() == ["002", "003", "001", "004"]
@@ -0,0 +1,42 @@
+import pandas as pd
+import pytest
+
+from dataframe_for_GPR_analysis import DataframeForAnalysis
+
+
+def write_rows(path, rows, header=False):
+    columns = ["ID", "Site of cancer", "QA Date"] + DataframeForAnalysis.criteria[:3] + ["MedianDoseDev"]
+    frame = pd.DataFrame(rows, columns=columns)
+    frame.to_csv(path, mode="w" if header else "a", header=header, index=False)
+
+
+def plan(i, day):
+    return [f"P{i}", "Prostate", f"2024-01-{day:02d}", 99.0 - i / 10, 97.0 - i / 10, 93.0 - i / 10, 0.5]
+
+
+@pytest.fixture
+def csv_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(DataframeForAnalysis, "cache_dir", str(tmp_path / "cache"))
+    path = tmp_path / "qa.csv"
+    write_rows(path, [plan(i, 10 + i) for i in range(5)], header=True)
+    return str(path)
+
+
+@pytest.mark.parametrize("fast_csv", [False, True])
+def test_refresh_after_cache_hit(csv_file, fast_csv):
+    DataframeForAnalysis.from_file(csv_file, fast_csv=fast_csv)
+    cached = DataframeForAnalysis.from_file(csv_file, fast_csv=fast_csv)
+    assert cached.source_path == csv_file
+
+    write_rows(csv_file, [plan(5, 1), plan(6, 20)])
+    refreshed = cached.refresh()
+
+    assert len(refreshed) == 7
+    assert refreshed["ID"].tolist() == ["P5", "P0", "P1", "P2", "P3", "P4", "P6"]
+    assert refreshed.refresh() is refreshed
+
+
+def test_refresh_without_changes_keeps_frame(csv_file):
+    DataframeForAnalysis.from_file(csv_file)
+    cached = DataframeForAnalysis.from_file(csv_file)
+    assert cached.refresh() is cached
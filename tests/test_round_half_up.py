@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataframe_for_GPR_analysis import DataframeForAnalysis
+
+
+@pytest.fixture(scope="module")
+def df():
+    return DataframeForAnalysis(pd.DataFrame({"x": [0.0]}))
+
+
+def assert_matches(df, values, ndigits):
+    values = np.asarray(values, dtype=float)
+    expected = np.array([df.round_half_up(value, ndigits) for value in values])
+    np.testing.assert_array_equal(df.round_half_up_array(values, ndigits), expected)
+
+
+def decimal_ties(ndigits, count=2000):
+    """Doubles nearest to the decimal ties k + 0.5 at the last kept digit, e.g. 2.675 for ndigits=2."""
+    k = np.arange(count, dtype=float)
+    return np.concatenate([(k + 0.5) / 10.0 ** ndigits, (k + 0.05) / 10.0 ** ndigits])
+
+
+@pytest.mark.parametrize("ndigits", [0, 1, 2, 3])
+def test_random_values(df, ndigits):
+    rng = np.random.default_rng(ndigits)
+    values = np.concatenate([rng.uniform(-200, 200, 20_000), rng.uniform(85, 100, 20_000),
+                             np.round(rng.uniform(0, 100, 20_000), ndigits + 1)])
+    assert_matches(df, values, ndigits)
+
+
+@pytest.mark.parametrize("ndigits", [0, 1, 2, 3])
+def test_decimal_ties(df, ndigits):
+    ties = decimal_ties(ndigits)
+    assert_matches(df, ties, ndigits)
+    assert_matches(df, -ties, ndigits)
+
+
+def test_known_ties(df):
+    values = [2.675, 0.125, 0.375, 1.005, 2.5, 0.5, -2.675, -0.125, -2.5]
+    assert_matches(df, values, 2)
+    assert_matches(df, values, 0)
+    assert df.round_half_up_array(np.array([2.675, 0.125]), 2).tolist() == [2.68, 0.13]
+
+
+@pytest.mark.parametrize("ndigits", [0, 1, 2, 3])
+def test_nextafter_neighbours_of_ties(df, ndigits):
+    ties = np.concatenate([decimal_ties(ndigits), -decimal_ties(ndigits)])
+    for _ in range(3):
+        below = np.nextafter(ties, -np.inf)
+        above = np.nextafter(ties, np.inf)
+        assert_matches(df, below, ndigits)
+        assert_matches(df, above, ndigits)
+        ties = np.concatenate([below, above])[: 2 * len(ties)]
+
+
+@pytest.mark.parametrize("ndigits", [0, 2])
+def test_large_magnitudes(df, ndigits):
+    rng = np.random.default_rng(7)
+    values = 10.0 ** rng.uniform(5, 20, 5000) * rng.choice([-1, 1], 5000)
+    ties = np.array([2.0 ** 44 + 0.5, 2.0 ** 40 + 0.5, 123456789012.5, 1e15 + 0.5]) / 10.0 ** ndigits
+    assert_matches(df, np.concatenate([values, ties, -ties]), ndigits)
+
+
+def test_special_values(df):
+    values = np.array([np.nan, 0.0, -0.0, 5e-324, -5e-324, np.finfo(float).tiny])
+    result = df.round_half_up_array(values, 2)
+    assert np.isnan(result[0])
+    assert_matches(df, values[1:], 2)
+
+
+def test_keeps_pandas_types(df):
+    frame = pd.DataFrame({"a": [2.675, np.nan], "b": [0.125, -1.005]}, index=[3, 5])
+    rounded = df.round_half_up_array(frame, 2)
+    assert isinstance(rounded, pd.DataFrame)
+    assert rounded.index.tolist() == [3, 5] and rounded.columns.tolist() == ["a", "b"]
+    series = df.round_half_up_array(frame["b"], 2)
+    assert isinstance(series, pd.Series) and series.name == "b"
+    assert series.tolist() == [0.13, -1.01]
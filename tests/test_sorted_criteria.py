@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from dataframe_for_GPR_analysis import DataframeForAnalysis
+
+
+def make_frame(n=200, seed=3):
+    rng = np.random.default_rng(seed)
+    data = {"ID": [f"P{i}" for i in range(n)]}
+    for column in DataframeForAnalysis.criteria[:3]:
+        values = np.round(100 - rng.gamma(2, 1.5, n), 2)
+        values[rng.random(n) < 0.1] = np.nan
+        data[column] = values
+    return DataframeForAnalysis(pd.DataFrame(data))
+
+
+def test_sorted_criteria_matches_np_sort():
+    df = make_frame()
+    columns = DataframeForAnalysis.criteria[:3]
+    np.testing.assert_array_equal(df.sorted_criteria(columns), np.sort(df.criteria_matrix(columns), axis=0))
+
+
+def test_sorted_criteria_follows_eliminations():
+    df = make_frame()
+    columns = DataframeForAnalysis.criteria[:3]
+    df.sorted_criteria(columns)
+    df.eliminate_ids(columns[:1], ["P0", "P1", "P2"])
+    np.testing.assert_array_equal(df.sorted_criteria(columns), np.sort(df.criteria_matrix(columns), axis=0))
+
+
+def test_sc_skewness_from_sorted_columns():
+    df = make_frame()
+    columns = DataframeForAnalysis.criteria[:3]
+    shared = df.spc_statistics(columns, skewness=True)["k3"]
+    own = df.spc_statistics(columns)["k3"]
+    np.testing.assert_allclose(shared, own, rtol=1e-12)
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataframe_for_GPR_analysis import DataframeForAnalysis, GridCounter
+
+
+@pytest.mark.parametrize("values", [
+    np.round(100 - np.random.default_rng(0).gamma(2, 1.5, 3000), 2),  # GPRs on the 0.01 grid
+    np.random.default_rng(1).normal(0.4, 0.2, 3000),                # mean γ, between grid points
+    np.random.default_rng(2).uniform(-50, 250, 3000),               # beyond the grid
+])
+def test_grid_counter_counts_exactly(values):
+    counter = GridCounter(values[:1000])
+    for value in values[1000:]:
+        counter.add(value)
+    ordered = np.sort(values)
+    queries = np.concatenate([values[:500], np.random.default_rng(3).uniform(-60, 260, 500)])
+    for x in queries:
+        assert counter.count_le(x) == np.searchsorted(ordered, x, side="right")
+
+
+@pytest.mark.parametrize("method", ["shewhart", "wsd", "swv", "sc"])
+def test_monitor_matches_batch_limits(method):
+    rng = np.random.default_rng(4)
+    column = "Global 3%2mm"
+    values = np.round(100 - rng.gamma(2, 1.5, 1500), 2)
+    df = DataframeForAnalysis(pd.DataFrame({"ID": [str(i) for i in range(values.size)], column: values}))
+
+    monitor = df.spc_monitor(column, method)
+    extra = np.round(100 - rng.gamma(2, 1.5, 500), 2)
+    for value in extra:
+        monitor.add(value)
+
+    full = np.concatenate([values, extra])
+    batch = DataframeForAnalysis(pd.DataFrame({"ID": [str(i) for i in range(full.size)], column: full}))
+    result = batch.compute_spc(method, selected_columns=[column])[0]
+    assert monitor.limits == (result.LCL, result.UCL, result.LSL, result.USL)
@@ -0,0 +1,27 @@
+from types import SimpleNamespace
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from dataframe_for_GPR_analysis import DataframeForAnalysis
+
+
+def test_nearest_point_picks_within_pixel_radius():
+    n = 50_000
+    df = DataframeForAnalysis(pd.DataFrame({"ID": [f"P{i}" for i in range(n)],
+                                            "Global 3%2mm": np.linspace(90, 100, n)}))
+    chart = df._x_chart_data(column="Global 3%2mm", CL=95, UCL=99, LCL=91,
+                             data_to_plot=df[["Global 3%2mm"]], out_of_control=[])
+    fig, ax = plt.subplots()
+    ax.set_xlim(1000, 1010)
+    fig.canvas.draw()
+
+    x, y = ax.transData.transform((1004, chart["y_float"][1004]))
+    radius = DataframeForAnalysis.x_chart_pick_radius
+    assert DataframeForAnalysis._nearest_point(ax, chart, SimpleNamespace(x=x + 2, y=y), radius) == 1004
+    assert DataframeForAnalysis._nearest_point(ax, chart, SimpleNamespace(x=x, y=y + 3 * radius), radius) is None
+    assert DataframeForAnalysis._nearest_point(ax, chart, SimpleNamespace(x=None, y=None), radius) is None
+    plt.close(fig)